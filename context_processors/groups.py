@@ -1,5 +1,7 @@
-from posts.models import Group
+from django.utils.functional import SimpleLazyObject
+
+from posts.caching import group_list
 
 
 def groups(request):
-    return {'group_list': Group.objects.all()}
+    return {'group_list': SimpleLazyObject(group_list)}
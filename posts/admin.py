@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .caching import refresh_group_list
+from .models import Comment, Follow, Group, Post, Task, UserStats
+from .search import search
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +11,11 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search(search_term, queryset), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
@@ -16,6 +23,18 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     prepopulated_fields = {'slug': ('title',)}
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_group_list()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_group_list()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        refresh_group_list()
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('text', 'author', 'post')
@@ -27,7 +46,20 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('user',)
 
 
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'followers', 'following', 'posts', 'comments')
+    search_fields = ('user__username',)
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'key')
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,212 @@
+"""JSON API только для чтения: лента, группы, профили, подписки и записи.
+
+Строки берутся через values() из тех же querysets, что и у страниц, без
+создания объектов моделей, и листаются курсорами CursorPaginator:
+?before=<next> — дальше к старым, ?after=<previous> — назад к новым.
+?fields=id,text оставляет в записях только перечисленные поля,
+?limit= задает размер страницы. Ответ — компактный JSON без пробелов
+со стабильным порядком ключей, сжатый gzip, если клиент его принимает.
+"""
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.gzip import gzip_page
+
+from .caching import cache_page_versioned, group_by_slug, read_replica
+from .models import Comment, Post, User
+from .paginators import COMMENTS_PER_PAGE, PER_PAGE, CursorPaginator
+from .stats import get_stats
+from .timeline import follow_feed
+
+MAX_LIMIT = 100
+
+# Поле ответа -> столбец values().
+POST_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+    'comments': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={
+        'ensure_ascii': False,
+        'separators': (',', ':'),
+    })
+
+
+def api_view(view):
+    """Отдает ошибки JSON-ом и сжимает ответ gzip."""
+    @gzip_page
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_response(
+                {'detail': 'Метод не поддерживается'}, 405,
+            )
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Не найдено'}, 404)
+        except ApiError as error:
+            return json_response({'detail': error.detail}, error.status)
+    return wrapper
+
+
+def _fields(request, available):
+    value = request.GET.get('fields')
+    if not value:
+        return list(available)
+    fields = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def _limit(request, default):
+    value = request.GET.get('limit')
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(400, f'limit должен быть от 1 до {MAX_LIMIT}')
+    return limit
+
+
+def _item(row, fields, available):
+    item = {}
+    for name in fields:
+        value = row[available[name]]
+        if name == 'image':
+            value = IMAGE_STORAGE.url(value) if value else None
+        item[name] = value
+    return item
+
+
+def _page(request, queryset, available, field='pub_date', per_page=PER_PAGE):
+    """Страница строк queryset: {'results': [...], 'next', 'previous'}."""
+    fields = _fields(request, available)
+    # Курсор строится по id и полю сортировки, даже если их не просили.
+    columns = dict.fromkeys(
+        [available[name] for name in fields] + ['id', field]
+    )
+    paginator = CursorPaginator(queryset.values(*columns),
+                                _limit(request, per_page), field=field)
+    page = paginator.get_page(
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    )
+    return {
+        'results': [_item(row, fields, available) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+@api_view
+@cache_page_versioned('index')
+def index(request):
+    return json_response(
+        _page(request, Post.objects.for_feed(), POST_FIELDS),
+    )
+
+
+@api_view
+@cache_page_versioned('group:{slug}')
+def group_posts(request, slug):
+    group = group_by_slug(slug)
+    if group is None:
+        raise Http404
+    return json_response({
+        'group': {
+            'slug': group.slug,
+            'title': group.title,
+            'description': group.description,
+        },
+        **_page(request, group.posts.for_feed(), POST_FIELDS),
+    })
+
+
+@api_view
+@read_replica('author:{user}')
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Требуется вход')
+    return json_response(
+        _page(request, follow_feed(request.user), POST_FIELDS),
+    )
+
+
+@api_view
+@cache_page_versioned('author:{username}')
+def profile(request, username):
+    author = User.objects.only(
+        'username', 'first_name', 'last_name',
+    ).filter(username=username).first()
+    if author is None:
+        raise Http404
+    stats = get_stats(author)
+    return json_response({
+        'author': {
+            'username': author.username,
+            'full_name': author.get_full_name(),
+            'posts': stats.posts,
+            'followers': stats.followers,
+            'following': stats.following,
+        },
+        **_page(request, author.posts.for_feed(), POST_FIELDS),
+    })
+
+
+@api_view
+@cache_page_versioned('author:{username}', 'post:{post_id}')
+def post_view(request, username, post_id):
+    fields = _fields(request, POST_FIELDS)
+    row = Post.objects.for_feed().filter(
+        pk=post_id, author__username=username,
+    ).values(*dict.fromkeys(POST_FIELDS[name] for name in fields)).first()
+    if row is None:
+        raise Http404
+    return json_response({'post': _item(row, fields, POST_FIELDS)})
+
+
+@api_view
+@cache_page_versioned('author:{username}', 'post:{post_id}')
+def comments(request, username, post_id):
+    if not Post.objects.filter(pk=post_id,
+                               author__username=username).exists():
+        raise Http404
+    return json_response(_page(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        field='created',
+        per_page=COMMENTS_PER_PAGE,
+    ))
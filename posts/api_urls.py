@@ -0,0 +1,32 @@
+from django.urls import path
+
+from . import api, batch
+
+app_name = 'api'
+
+urlpatterns = [
+    path('',
+         api.index,
+         name='index'),
+    path('group/<slug:slug>/',
+         api.group_posts,
+         name='group'),
+    path('follow/',
+         api.follow_index,
+         name='follow_index'),
+    path('batch/posts/',
+         batch.posts,
+         name='batch_posts'),
+    path('batch/comments/',
+         batch.comments,
+         name='batch_comments'),
+    path('<str:username>/',
+         api.profile,
+         name='profile'),
+    path('<str:username>/<int:post_id>/',
+         api.post_view,
+         name='post'),
+    path('<str:username>/<int:post_id>/comments/',
+         api.comments,
+         name='comments'),
+]
@@ -0,0 +1,216 @@
+"""Пакетное создание записей и комментариев одним запросом.
+
+Тело запроса — JSON {"items": [...]}; записи с картинками отправляются
+multipart-формой, где поле items содержит тот же JSON, а файл элемента
+номер n лежит в поле image-<n>. Каждый элемент проверяется как форма
+PostForm или CommentForm, все прошедшие проверку вставляются
+bulk_create в одной транзакции, а счетчики, ленты, поиск и поколения
+кэша обновляются один раз на пакет, а миниатюры ставятся в очередь
+после коммита. В ответе results по порядку элементов: {"id": ...}
+или {"errors": {поле: [сообщения]}}.
+"""
+import json
+from functools import wraps
+
+from django import forms
+from django.conf import settings
+from django.db import transaction
+
+from . import caching, counters, search, thumbnails, timeline
+from .api import ApiError, json_response
+from .forms import CommentForm, PostForm
+from .models import Comment, Group, Post
+from .stats import change_stats
+from .transfer import create_with_pks
+from .uploads import limited_uploads
+
+
+def _max_items():
+    return getattr(settings, 'POSTS_BATCH_MAX_ITEMS', 500)
+
+
+def batch_view(view):
+    """POST от вошедшего пользователя; ошибки пакета отдаются JSON-ом."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            response = json_response(
+                {'detail': 'Метод не поддерживается'}, 405,
+            )
+            response['Allow'] = 'POST'
+            return response
+        try:
+            if not request.user.is_authenticated:
+                raise ApiError(401, 'Требуется вход')
+            return view(request, _items(request), *args, **kwargs)
+        except ApiError as error:
+            return json_response({'detail': error.detail}, error.status)
+    return wrapper
+
+
+def _items(request):
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = {'items': json.loads(request.POST.get('items', ''))}
+    except ValueError:
+        raise ApiError(400, 'Тело запроса — не JSON')
+    items = data.get('items') if isinstance(data, dict) else data
+    if (not isinstance(items, list) or not items
+            or not all(isinstance(item, dict) for item in items)):
+        raise ApiError(400, 'items — непустой список объектов')
+    if len(items) > _max_items():
+        raise ApiError(
+            400, f'В пакете больше {_max_items()} элементов',
+        )
+    return items
+
+
+def _errors(form):
+    return {field: list(errors) for field, errors in form.errors.items()}
+
+
+def _response(results):
+    created = sum('id' in result for result in results)
+    return json_response(
+        {'created': created, 'results': results},
+        201 if created else 400,
+    )
+
+
+def _pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _pks(values):
+    return {_pk(value) for value in values} - {None}
+
+
+class GroupChoiceField(forms.ModelChoiceField):
+    """Выбор группы из заранее загруженного словаря pk -> Group."""
+
+    def __init__(self, groups, **kwargs):
+        super().__init__(Group.objects.all(), **kwargs)
+        self.groups = groups
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.groups[_pk(value)]
+        except KeyError:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+            )
+
+
+class BatchPostForm(PostForm):
+    """PostForm, которая не читает группу из базы для каждого элемента."""
+
+    def __init__(self, *args, groups, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['group']
+        self.fields['group'] = GroupChoiceField(
+            groups, required=field.required, label=field.label,
+            help_text=field.help_text,
+        )
+
+    def _get_validation_exclusions(self):
+        # Группу уже нашел GroupChoiceField; проверка внешнего ключа
+        # в full_clean стоила бы запроса на каждый элемент.
+        return super()._get_validation_exclusions() + ['group']
+
+
+def create_posts(author, items, files):
+    """Проверяет и вставляет записи author; возвращает results."""
+    groups = Group.objects.in_bulk(_pks(
+        item.get('group') for item in items
+    ))
+    results = []
+    posts = []
+    for number, item in enumerate(items):
+        upload = files.get(f'image-{number}')
+        form = BatchPostForm(
+            item, {'image': upload} if upload else {}, groups=groups,
+        )
+        if not form.is_valid():
+            results.append({'errors': _errors(form)})
+            continue
+        post = form.save(commit=False)
+        post.author = author
+        posts.append(post)
+        results.append(post)
+    if not posts:
+        return results
+    with transaction.atomic():
+        create_with_pks(Post, posts)
+        counters.change_post_counts(posts, 1)
+        change_stats(author.pk, posts=len(posts))
+        timeline.fan_out(posts)
+        search.index_posts(posts)
+        transaction.on_commit(lambda: thumbnails.schedule_posts(posts))
+    caching.bump('index', f'author:{author.username}', *{
+        f'group:{post.group.slug}' for post in posts if post.group_id
+    })
+    return [
+        {'id': result.pk} if isinstance(result, Post) else result
+        for result in results
+    ]
+
+
+def create_comments(author, items):
+    """Проверяет и вставляет комментарии author; возвращает results."""
+    posts = {
+        row['pk']: row for row in Post.objects.filter(
+            pk__in=_pks(item.get('post') for item in items),
+        ).values('pk', 'author__username', 'group__slug')
+    }
+    results = []
+    comments = []
+    for item in items:
+        form = CommentForm(item)
+        post = posts.get(_pk(item.get('post')))
+        if not form.is_valid() or post is None:
+            errors = _errors(form)
+            if post is None:
+                errors['post'] = ['Запись не найдена']
+            results.append({'errors': errors})
+            continue
+        comment = form.save(commit=False)
+        comment.author = author
+        comment.post_id = post['pk']
+        comments.append(comment)
+        results.append(comment)
+    if not comments:
+        return results
+    with transaction.atomic():
+        create_with_pks(Comment, comments)
+        change_stats(author.pk, comments=len(comments))
+    scopes = {'index'}
+    for comment in comments:
+        post = posts[comment.post_id]
+        scopes.add(f'post:{post["pk"]}')
+        scopes.add(f'author:{post["author__username"]}')
+        if post['group__slug']:
+            scopes.add(f'group:{post["group__slug"]}')
+    caching.bump(*scopes)
+    return [
+        {'id': result.pk} if isinstance(result, Comment) else result
+        for result in results
+    ]
+
+
+@limited_uploads
+@batch_view
+def posts(request, items):
+    return _response(create_posts(request.user, items, request.FILES))
+
+
+@batch_view
+def comments(request, items):
+    return _response(create_comments(request.user, items))
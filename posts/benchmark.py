@@ -0,0 +1,140 @@
+"""Нагрузочный замер страниц записей на синтетических данных."""
+import math
+import platform
+import random
+import time
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Comment, Follow, Group, Post, User
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_view', 'follow_index',
+         'add_comment', 'profile_follow')
+
+
+def seed(users=50, groups=5, posts=1000, comments=3, follows=10,
+         random_seed=0):
+    """Заполняет базу через generate_fake_data; одинаковый seed — те же
+    данные с теми же распределениями, что и у генератора."""
+    call_command(
+        'generate_fake_data', users=users, groups=groups, posts=posts,
+        comments=comments, follows=follows, image_fraction=0,
+        prefix='user', seed=random_seed, stdout=StringIO(),
+        stderr=StringIO(),
+    )
+    return {'users': users, 'groups': groups, 'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'follows': Follow.objects.count()}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def _requests(rng, viewer):
+    """Бесконечный поток (имя view, метод, url, данные) для замеров."""
+    users = list(User.objects.exclude(pk=viewer.pk).values_list(
+        'username', flat=True))
+    slugs = list(Group.objects.values_list('slug', flat=True))
+    posts = list(Post.objects.values_list('author__username', 'pk'))
+    unfollowed = list(User.objects.exclude(pk=viewer.pk).exclude(
+        following__user=viewer,
+    ).values_list('username', flat=True))
+    while True:
+        username, post_id = rng.choice(posts)
+        post = {'username': username, 'post_id': post_id}
+        yield 'index', 'get', reverse('index'), None
+        if slugs:
+            yield ('group_posts', 'get',
+                   reverse('group', args=[rng.choice(slugs)]), None)
+        yield ('profile', 'get',
+               reverse('profile', args=[rng.choice(users)]), None)
+        yield 'post_view', 'get', reverse('post', kwargs=post), None
+        yield 'follow_index', 'get', reverse('follow_index'), None
+        yield ('add_comment', 'post', reverse('add_comment', kwargs=post),
+               {'text': 'Комментарий из замера'})
+        author = unfollowed.pop() if unfollowed else rng.choice(users)
+        yield ('profile_follow', 'get',
+               reverse('profile_follow', args=[author]), None)
+
+
+def measure(iterations=50, cold=False, random_seed=0):
+    """Латентность, запросы к базе и размер ответа для каждого view.
+
+    cold=True очищает кэш перед каждым запросом.
+    """
+    rng = random.Random(random_seed)
+    viewer = User.objects.order_by('pk').first()
+    client = Client()
+    client.force_login(viewer)
+    samples = {
+        name: [] for name in VIEWS
+        if name != 'group_posts' or Group.objects.exists()
+    }
+    requests = _requests(rng, viewer)
+    while min(len(values) for values in samples.values()) < iterations:
+        name, method, url, data = next(requests)
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: {url} вернул {response.status_code}')
+        samples[name].append(
+            (elapsed * 1000, len(queries), len(response.content))
+        )
+    results = {}
+    for name, values in samples.items():
+        latency = [value[0] for value in values]
+        queries = [value[1] for value in values]
+        results[name] = {
+            'requests': len(values),
+            'p50_ms': round(percentile(latency, 50), 3),
+            'p95_ms': round(percentile(latency, 95), 3),
+            'p99_ms': round(percentile(latency, 99), 3),
+            'max_ms': round(max(latency), 3),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+            'bytes_p50': percentile([value[2] for value in values], 50),
+        }
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Список регрессий относительно baseline: медленнее p95 или больше SQL."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {current["p95_ms"]} мс '
+                f'вместо {previous["p95_ms"]} мс'
+            )
+        if current['queries_max'] > previous['queries_max']:
+            regressions.append(
+                f'{name}: {current["queries_max"]} запросов '
+                f'вместо {previous["queries_max"]}'
+            )
+    return regressions
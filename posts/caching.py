@@ -0,0 +1,224 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from yatube.db import replica_configured, replica_reads
+
+from .models import Group
+
+GENERATION_PREFIX = 'gen'
+PAGE_PREFIX = 'page'
+GROUPS_PREFIX = 'groups'
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+
+_group_list = (None, [], {})
+
+
+def _generation_key(scope):
+    return f'{GENERATION_PREFIX}:{scope}'
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def generations(scopes):
+    """Текущие поколения scope; отсутствующие заводятся текущим временем.
+
+    Поколение — метка времени последнего изменения scope в микросекундах,
+    поэтому потерянный при вытеснении счетчик только делает кэш
+    недействительным и никогда не возвращает устаревшую страницу.
+    """
+    keys = [_generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    missing = {key: _now() for key in keys if key not in values}
+    if missing:
+        cache.set_many(missing, None)
+        values.update(missing)
+    return [values[key] for key in keys]
+
+
+def bump(*scopes):
+    now = _now()
+    cache.set_many(
+        {_generation_key(scope): now for scope in set(scopes)}, None,
+    )
+
+
+def invalidate_post(post, old_group_id=None):
+    scopes = ['index', f'post:{post.pk}', f'author:{post.author.username}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    if old_group_id and old_group_id != post.group_id:
+        slug = Group.objects.filter(
+            pk=old_group_id,
+        ).values_list('slug', flat=True).first()
+        scopes.append(f'group:{slug}')
+    bump(*scopes)
+
+
+def invalidate_follow(follow):
+    bump(f'author:{follow.author.username}', f'author:{follow.user.username}')
+
+
+def invalidate_groups():
+    bump('groups')
+
+
+def _load_groups():
+    global _group_list
+    generation, = generations(['groups'])
+    if _group_list[0] != generation:
+        key = f'{GROUPS_PREFIX}:{generation}'
+        groups = cache.get(key)
+        if groups is None:
+            groups = list(
+                Group.objects.order_by('title').values(*GROUP_FIELDS)
+            )
+            cache.set(key, groups)
+        by_slug = {group['slug']: group for group in groups}
+        _group_list = (generation, groups, by_slug)
+    return _group_list
+
+
+def group_list():
+    """Список групп (словари GROUP_FIELDS) из памяти процесса или кэша.
+
+    Список привязан к поколению 'groups', которое сдвигается при любом
+    изменении Group.
+    """
+    return _load_groups()[1]
+
+
+def refresh_group_list():
+    invalidate_groups()
+    return group_list()
+
+
+def group_by_slug(slug):
+    row = _load_groups()[2].get(slug)
+    if row is None:
+        return None
+    return Group(**row)
+
+
+def page_version(request, scopes):
+    """Версия страницы для текущего зрителя: (digest, время изменения).
+
+    digest меняется вместе с поколением любого scope, время — метка
+    последнего из них в секундах. None — страницу нельзя отдать повторно.
+    """
+    user = request.user
+    if user.is_authenticated:
+        # Страница авторизованного пользователя содержит его CSRF-токен,
+        # поэтому без CSRF-cookie ее нельзя отдать повторно.
+        csrf = request.META.get('CSRF_COOKIE')
+        if not csrf:
+            return None
+        viewer = f'{user.pk}:{csrf}'
+    else:
+        viewer = 'anon'
+    values = generations([*scopes, 'groups'])
+    parts = [request.get_full_path(), viewer, *map(str, values)]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return digest, max(values) // 1_000_000
+
+
+def _set_validators(request, response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Браузер хранит страницу, но каждый раз сверяет ее с сервером.
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+
+def settled(scopes):
+    """Не менялись ли scopes дольше DB_REPLICA_LAG секунд.
+
+    Тогда реплика уже получила последние изменения и с нее можно читать,
+    не рискуя закэшировать устаревшую страницу под новым поколением.
+    """
+    lag = getattr(settings, 'DB_REPLICA_LAG', 5) * 1_000_000
+    return _now() - max(generations(scopes)) >= lag
+
+
+def _format_scopes(scopes, request, kwargs):
+    return [
+        scope.format(user=request.user.username, **kwargs)
+        for scope in scopes
+    ]
+
+
+def _call_view(view, request, args, kwargs, scopes):
+    replica = (request.method in ('GET', 'HEAD') and replica_configured()
+               and settled(scopes))
+    with replica_reads(replica):
+        return view(request, *args, **kwargs)
+
+
+def read_replica(*scopes):
+    """Выполняет GET-запрос к view с чтением с реплики, если scopes
+    устоялись; в scopes доступен {user} — имя текущего пользователя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return _call_view(view, request, args, kwargs,
+                              _format_scopes(scopes, request, kwargs))
+        return wrapper
+    return decorator
+
+
+def cache_page_versioned(*scopes):
+    """Кэширует GET-ответ view до изменения любого из scopes.
+
+    scopes — шаблоны str.format, которые заполняются аргументами из URL,
+    например 'author:{username}'. Ответ несет ETag и Last-Modified версии
+    страницы, и на If-None-Match/If-Modified-Since без изменений сразу
+    уходит 304. Поколение заводится и для несуществующей страницы,
+    поэтому If-Modified-Since сверяется, только если страница этой версии
+    уже есть в кэше, — иначе view ответит 404. Промахи кэша читают данные
+    с реплики, как read_replica.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            page_scopes = _format_scopes(scopes, request, kwargs)
+            version = page_version(request, page_scopes)
+            if version is None:
+                return _call_view(view, request, args, kwargs, page_scopes)
+            digest, last_modified = version
+            etag = f'"{digest}"'
+            key = f'{PAGE_PREFIX}:{view.__name__}:{digest}'
+            cached = None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                cached = cache.get(key)
+                if cached is not None:
+                    response = get_conditional_response(
+                        request, etag=etag, last_modified=last_modified,
+                    )
+            if response is not None:
+                _set_validators(request, response, etag, last_modified)
+                return response
+            response = cached
+            if response is None:
+                response = _call_view(view, request, args, kwargs,
+                                      page_scopes)
+                if response.status_code == 200 and not response.streaming:
+                    _set_validators(request, response, etag, last_modified)
+                    cache.set(key, response, getattr(
+                        settings, 'POSTS_PAGE_CACHE_TIMEOUT', 60 * 60,
+                    ))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,87 @@
+"""Счетчики записей в кэше для нумерованных страниц без COUNT(*).
+
+Счетчик создается одним COUNT(*) при первом чтении и дальше сдвигается
+incr при создании и удалении записей. incr на бэкендах db и file не
+атомарен, а подсчет может разминуться с параллельной вставкой, поэтому
+ключ счетчика меняется каждые POSTS_COUNT_TIMEOUT секунд: накопленное
+расхождение живет не дольше этого срока, после чего счетчик считается
+заново.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+KEY_PREFIX = 'post_count'
+
+
+def _timeout():
+    return getattr(settings, 'POSTS_COUNT_TIMEOUT', 60 * 60)
+
+
+def _key(scope):
+    period = int(time.time() // _timeout())
+    return f'{KEY_PREFIX}:{period}:{scope}'
+
+
+def post_count(scope, queryset):
+    """Число записей в scope: из кэша, а при промахе — один COUNT(*)."""
+    key = _key(scope)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        # add не затирает счетчик, который успел создать другой запрос
+        # и, возможно, уже сдвинуть incr.
+        if not cache.add(key, count, _timeout()):
+            count = cache.get(key, count)
+    return count
+
+
+def post_scopes(post):
+    return ['all', f'author:{post.author_id}', f'group:{post.group_id}']
+
+
+def _apply(deltas):
+    for scope, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(_key(scope), delta)
+        except ValueError:
+            # Счетчика нет в кэше — он будет посчитан при первом чтении.
+            pass
+
+
+def change_post_counts(posts, delta):
+    """Сдвигает счетчики всех scope, в которые входят posts, на delta."""
+    deltas = Counter()
+    by_author = Counter()
+    for post in posts:
+        for scope in post_scopes(post):
+            deltas[scope] += delta
+        by_author[post.author_id] += delta
+    followers = Follow.objects.filter(
+        author_id__in=by_author,
+    ).values_list('user_id', 'author_id')
+    for user_id, author_id in followers:
+        deltas[f'feed:{user_id}'] += by_author[author_id]
+    deltas.pop('group:None', None)
+    _apply(deltas)
+
+
+def move_post(post, old_group_id):
+    if old_group_id == post.group_id:
+        return
+    deltas = Counter({
+        f'group:{old_group_id}': -1,
+        f'group:{post.group_id}': 1,
+    })
+    deltas.pop('group:None', None)
+    _apply(deltas)
+
+
+def reset_feed_count(user_id):
+    cache.delete(_key(f'feed:{user_id}'))
@@ -0,0 +1,161 @@
+"""Генерация больших синтетических наборов данных.
+
+Популярность авторов и размеры групп распределены по закону Ципфа:
+вес элемента с рангом r равен 1 / r ** s. Случайные числа для каждой
+пачки берутся из генератора с seed '<seed>:<вид>:<номер пачки>', поэтому
+результат не зависит от числа процессов.
+"""
+import itertools
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import create_with_dates
+
+WORDS = ('кот', 'собака', 'дом', 'город', 'книга', 'лето', 'море', 'друг',
+         'утро', 'дорога', 'день', 'вечер', 'музыка', 'работа', 'время',
+         'жизнь', 'солнце', 'дождь', 'снег', 'поезд', 'письмо', 'окно')
+PLACEHOLDER_COLORS = ('#b3cde0', '#6497b1', '#005b96', '#fbb4ae',
+                      '#ccebc5', '#decbe4', '#fed9a6', '#e5d8bd')
+
+# SQLite вставляет пачку одним составным SELECT не длиннее 500 строк.
+INSERT_BATCH = 500
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса Ципфа для rng.choices(cum_weights=...)."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def group_weights(count, exponent, ungrouped=0.3):
+    """Веса групп и последним — записей без группы с долей ungrouped."""
+    weights = zipf_weights(count, exponent)
+    if not weights:
+        return [1]
+    return weights + [weights[-1] / (1 - ungrouped)]
+
+
+def chunk_rng(seed, kind, number):
+    return random.Random(f'{seed}:{kind}:{number}')
+
+
+def _text(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize()
+
+
+def _geometric(rng, mean):
+    """Неотрицательное целое с заданным средним и длинным хвостом."""
+    if mean <= 0:
+        return 0
+    return int(rng.expovariate(1 / mean))
+
+
+def create_users(count, prefix, batch_size):
+    for start in range(0, count, batch_size):
+        User.objects.bulk_create([
+            User(username=f'{prefix}{number}', password='!')
+            for number in range(start, min(start + batch_size, count))
+        ], batch_size=INSERT_BATCH, ignore_conflicts=True)
+    return list(User.objects.filter(
+        username__startswith=prefix,
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def create_groups(count, prefix):
+    Group.objects.bulk_create([
+        Group(title=f'Сообщество {number}', slug=f'{prefix}{number}',
+              description=f'Сообщество номер {number}')
+        for number in range(count)
+    ], batch_size=INSERT_BATCH, ignore_conflicts=True)
+    return list(Group.objects.filter(
+        slug__startswith=prefix,
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def create_placeholders(count=len(PLACEHOLDER_COLORS)):
+    """Сохраняет картинки-заглушки и возвращает их имена в хранилище."""
+    storage = Post._meta.get_field('image').storage
+    names = []
+    for color in PLACEHOLDER_COLORS[:count]:
+        content = BytesIO()
+        Image.new('RGB', (960, 540), color).save(content, 'JPEG', quality=80)
+        names.append(storage.save(
+            'posts/placeholder.jpg', ContentFile(content.getvalue()),
+        ))
+    return names
+
+
+def create_post_chunk(state, number):
+    """Создает пачку записей номер number с комментариями к ним.
+
+    state — общие для всех пачек параметры и списки pk.
+    """
+    rng = chunk_rng(state['seed'], 'posts', number)
+    start = number * state['batch_size']
+    size = min(state['batch_size'], state['posts'] - start)
+    users = state['users']
+    now = timezone.now()
+    with transaction.atomic():
+        authors = rng.choices(users, cum_weights=state['author_weights'],
+                              k=size)
+        groups = rng.choices(state['groups'] + [None],
+                             cum_weights=state['group_weights'], k=size)
+        posts = create_with_dates(Post, [
+            Post(
+                author_id=author_id,
+                group_id=group_id,
+                text=_text(rng, 5, 60),
+                pub_date=now - timedelta(
+                    seconds=rng.randint(0, state['days'] * 86400)),
+                image=(rng.choice(state['images'])
+                       if state['images']
+                       and rng.random() < state['image_fraction'] else ''),
+            )
+            for author_id, group_id in zip(authors, groups)
+        ], 'pub_date', batch_size=INSERT_BATCH)
+        comments = []
+        for post in posts:
+            for _ in range(_geometric(rng, state['comments'])):
+                comments.append(Comment(
+                    post_id=post.pk,
+                    author_id=rng.choice(users),
+                    text=_text(rng, 2, 20),
+                    created=post.pub_date + timedelta(
+                        seconds=rng.randint(0, 7 * 86400)),
+                ))
+        create_with_dates(Comment, comments, 'created',
+                          batch_size=INSERT_BATCH)
+    return size, len(comments)
+
+
+def create_follow_chunk(state, number):
+    """Подписки пользователей пачки number на популярных авторов."""
+    rng = chunk_rng(state['seed'], 'follows', number)
+    users = state['users']
+    followers = users[number * state['batch_size']:
+                      (number + 1) * state['batch_size']]
+    follows = []
+    for user_id in followers:
+        count = min(_geometric(rng, state['follows']), len(users) - 1)
+        authors = dict.fromkeys(rng.choices(
+            users, cum_weights=state['author_weights'], k=count,
+        ))
+        authors.pop(user_id, None)
+        follows.extend(
+            Follow(user_id=user_id, author_id=author_id)
+            for author_id in authors
+        )
+    with transaction.atomic():
+        Follow.objects.bulk_create(
+            follows, batch_size=INSERT_BATCH, ignore_conflicts=True,
+        )
+    return len(follows)
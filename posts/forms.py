@@ -1,6 +1,9 @@
+from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from .models import Comment, Post
+from .uploads import OversizedUpload, check_limits, normalize_image
 
 
 class PostForm(ModelForm):
@@ -8,6 +11,31 @@ class PostForm(ModelForm):
         model = Post
         fields = ['group', 'text', 'image']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Содержимое слишком большого файла уже отброшено
+        # LimitedUploadHandler, декодировать его нечего.
+        self.oversized = {
+            name: upload for name, upload in self.files.items()
+            if isinstance(upload, OversizedUpload)
+        }
+        if self.oversized:
+            self.files = self.files.copy()
+            for name in self.oversized:
+                del self.files[name]
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if 'image' in self.oversized:
+            raise forms.ValidationError(
+                check_limits(self.oversized['image']))
+        if not isinstance(image, UploadedFile):
+            return image
+        error = check_limits(image)
+        if error:
+            raise forms.ValidationError(error)
+        return normalize_image(image)
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет страницы записей на синтетических данных во '
+            'временной тестовой базе и выводит результат в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=float, default=3,
+                            help='Среднее число комментариев к записи')
+        parser.add_argument('--follows', type=float, default=10,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--output', help='Куда записать JSON')
+        parser.add_argument('--baseline',
+                            help='JSON прошлого запуска для сравнения')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост p95, доля')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(DEBUG=False):
+                report = self.run(options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['views']
+            regressions = benchmark.compare(
+                report['views'], baseline, options['tolerance'],
+            )
+            if regressions:
+                raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+
+    def run(self, options):
+        dataset = benchmark.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            random_seed=options['seed'],
+        )
+        return {
+            'environment': benchmark.environment(),
+            'dataset': dataset,
+            'cold': options['cold'],
+            'views': benchmark.measure(
+                iterations=options['iterations'],
+                cold=options['cold'],
+                random_seed=options['seed'],
+            ),
+        }
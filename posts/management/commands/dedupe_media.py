@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import default, delete
+
+from posts import caching, media
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки записей в хранилище по хэшу и удаляет '
+            'файлы и миниатюры, на которые ничто не ссылается')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не удалять файлы моложе стольких секунд '
+                 '(по умолчанию POSTS_MEDIA_GRACE)',
+        )
+
+    def deduplicate(self):
+        moved = 0
+        for name in sorted(media.referenced_images()):
+            new_name = media.deduplicate(name)
+            if new_name is None:
+                continue
+            with transaction.atomic():
+                posts = Post.objects.filter(image=name)
+                for post in posts.select_related('author', 'group'):
+                    caching.invalidate_post(post)
+                posts.update(image=new_name)
+            moved += 1
+        return moved
+
+    def handle(self, *args, dry_run, grace, **options):
+        moved = 0 if dry_run else self.deduplicate()
+        images = media.orphaned_images(grace)
+        if not dry_run:
+            for name in images:
+                delete(media.field_file(name))
+            default.kvstore.cleanup()
+        thumbnails = media.orphaned_thumbnails(grace)
+        if not dry_run:
+            for name in thumbnails:
+                default.storage.delete(name)
+        for name in images + thumbnails:
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено картинок: {moved}, удалено картинок: {len(images)}, '
+            f'миниатюр: {len(thumbnails)}'
+        ))
@@ -0,0 +1,37 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, записи с комментариями и подписки в JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, path, batch_size, **options):
+        output = (sys.stdout if path == '-'
+                  else open(path, 'w', encoding='utf-8'))
+        started = time.monotonic()
+        count = 0
+        try:
+            for line in export_lines(batch_size):
+                output.write(line)
+                count += 1
+                if count % batch_size == 0:
+                    self.progress(count, started)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.progress(count, started)
+
+    def progress(self, count, started):
+        rate = count / max(time.monotonic() - started, 1e-6)
+        self.stderr.write(f'Выгружено строк: {count} ({rate:.0f}/с)')
@@ -0,0 +1,116 @@
+import math
+import multiprocessing
+import time
+from functools import partial
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import fake_data
+
+
+class Command(BaseCommand):
+    help = ('Создает пользователей, группы, записи, комментарии и подписки '
+            'с распределениями Ципфа для нагрузочных проверок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--comments', type=float, default=2,
+                            help='Среднее число комментариев к записи')
+        parser.add_argument('--follows', type=float, default=20,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа')
+        parser.add_argument('--image-fraction', type=float, default=0.1,
+                            help='Доля записей с картинкой-заглушкой')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить записи')
+        parser.add_argument('--prefix', default='fake',
+                            help='Префикс имен пользователей и slug групп')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Процессов для записей и подписок; '
+                                 'на SQLite пишет только один процесс')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Не пересчитывать статистику, ленты и '
+                                 'поисковый индекс')
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        batch_size = options['batch_size']
+        users = fake_data.create_users(
+            options['users'], options['prefix'], batch_size)
+        groups = fake_data.create_groups(
+            options['groups'], f'{options["prefix"]}-')
+        self.report(f'Пользователей: {len(users)}, групп: {len(groups)}')
+        images = []
+        if options['image_fraction'] > 0:
+            images = fake_data.create_placeholders()
+        state = {
+            'seed': options['seed'],
+            'batch_size': batch_size,
+            'posts': options['posts'],
+            'comments': options['comments'],
+            'follows': options['follows'],
+            'days': options['days'],
+            'image_fraction': options['image_fraction'],
+            'images': images,
+            'users': users,
+            'groups': groups,
+            'author_weights': fake_data.zipf_weights(
+                len(users), options['zipf']),
+            'group_weights': fake_data.group_weights(
+                len(groups), options['zipf']),
+        }
+        posts = comments = follows = 0
+        with self.pool(options['workers']) as pool:
+            chunks = range(math.ceil(options['posts'] / batch_size))
+            for created, commented in pool.imap_unordered(
+                    partial(fake_data.create_post_chunk, state), chunks):
+                posts += created
+                comments += commented
+                self.report(f'Записей: {posts}, комментариев: {comments}')
+            chunks = range(math.ceil(len(users) / batch_size))
+            for created in pool.imap_unordered(
+                    partial(fake_data.create_follow_chunk, state), chunks):
+                follows += created
+                self.report(f'Подписок: {follows}')
+        if not options['skip_derived']:
+            call_command('recount_stats', stdout=self.stderr)
+            call_command('rebuild_timelines', stdout=self.stderr)
+            call_command('rebuild_search_index', stdout=self.stderr)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано записей: {posts}, комментариев: {comments}, '
+            f'подписок: {follows}'
+        ))
+
+    def pool(self, workers):
+        if workers > 1:
+            # spawn, а не fork: дочерний процесс не наследует открытое
+            # родителем соединение с базой и открывает свое.
+            context = multiprocessing.get_context('spawn')
+            return context.Pool(workers, initializer=django.setup)
+        return InlinePool()
+
+    def report(self, message):
+        elapsed = time.monotonic() - self.started
+        self.stderr.write(f'[{elapsed:7.1f} с] {message}')
+
+
+class InlinePool:
+    """Пул без процессов с интерфейсом multiprocessing.Pool."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def imap_unordered(self, function, iterable):
+        return map(function, iterable)
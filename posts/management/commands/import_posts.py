@@ -0,0 +1,77 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import ImportCheckpoint
+from posts.transfer import IMPORTERS
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts пачками; в транзакции каждой '
+            'пачки сохраняет позицию, с которой можно продолжить (--resume)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя позиции в ImportCheckpoint, по умолчанию полный '
+                 'путь к выгрузке',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с сохраненной позиции',
+        )
+
+    def handle(self, *args, path, batch_size, checkpoint, resume, **options):
+        self.checkpoint = checkpoint or os.path.abspath(path)
+        checkpoints = ImportCheckpoint.objects.filter(name=self.checkpoint)
+        state = {'offset': 0, 'counts': {}}
+        saved = checkpoints.first() if resume else None
+        if saved is not None:
+            state = {'offset': saved.offset,
+                     'counts': json.loads(saved.counts)}
+        self.started = time.monotonic()
+        self.imported = 0
+        with open(path, 'rb') as file:
+            file.seek(state['offset'])
+            model, rows = None, []
+            while True:
+                line = file.readline()
+                row = json.loads(line) if line.strip() else None
+                if rows and (row is None or row['model'] != model
+                             or len(rows) == batch_size):
+                    self.flush(model, rows, state, file.tell() - len(line))
+                    rows = []
+                if not line:
+                    break
+                if row is None:
+                    continue
+                if row['model'] not in IMPORTERS:
+                    raise CommandError(f'Неизвестная модель: {row["model"]}')
+                model = row['model']
+                rows.append(row['fields'])
+        checkpoints.delete()
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(
+                f'{name} {count}' for name, count in state['counts'].items()
+            )
+        ))
+
+    def flush(self, model, rows, state, offset):
+        with transaction.atomic():
+            count = IMPORTERS[model](rows)
+            counts = {**state['counts'],
+                      model: state['counts'].get(model, 0) + count}
+            ImportCheckpoint.objects.update_or_create(
+                name=self.checkpoint,
+                defaults={'offset': offset, 'counts': json.dumps(counts)},
+            )
+        state['offset'] = offset
+        state['counts'] = counts
+        self.imported += len(rows)
+        rate = self.imported / max(time.monotonic() - self.started, 1e-6)
+        self.stderr.write(f'{model}: {state["counts"][model]} ({rate:.0f}/с)')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет поисковый индекс записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        with transaction.atomic():
+            count = search.rebuild_index(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано записей: {count}'
+        ))
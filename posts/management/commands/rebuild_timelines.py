@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет ленты подписок из таблицы Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='usernames', action='append', default=[],
+            help='Перестроить ленту только этого пользователя',
+        )
+
+    def handle(self, *args, usernames, **options):
+        follows = Follow.objects.order_by('user_id')
+        if usernames:
+            follows = follows.filter(user__username__in=usernames)
+        rebuilt = set()
+        for user_id, author_id in follows.values_list(
+                'user_id', 'author_id').iterator():
+            with transaction.atomic():
+                if user_id not in rebuilt:
+                    TimelineEntry.objects.filter(user_id=user_id).delete()
+                    rebuilt.add(user_id)
+                timeline.backfill(user_id, author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перестроено лент: {len(rebuilt)}'
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+from posts.stats import recount
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает статистику пользователей, исправляет расхождения '
+            'и признак популярного автора')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько пользователей пересчитывать за один проход',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        batch, checked, repaired = [], 0, 0
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                repaired += self.recount(batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            repaired += self.recount(batch)
+            checked += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено пользователей: {checked}, исправлено: {repaired}'
+        ))
+
+    def recount(self, user_ids):
+        repaired = recount(user_ids)
+        timeline.reclassify(user_ids)
+        return repaired
@@ -0,0 +1,60 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from posts import tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди posts.tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Сколько задач выполнять параллельно; '
+                                 'на SQLite пишет только один процесс')
+        parser.add_argument('--pool', choices=('thread', 'process'),
+                            default='thread',
+                            help='Пул потоков или процессов для --workers')
+        parser.add_argument('--batch', type=int, default=100,
+                            help='Сколько задач занимать за раз')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true',
+                            help='Выйти, когда готовые задачи кончатся')
+
+    def handle(self, *args, workers, pool, batch, interval, once,
+               **options):
+        executor = None
+        if workers > 1 and pool == 'process':
+            # spawn, а не fork: дочерний процесс не наследует открытое
+            # родителем соединение с базой и открывает свое.
+            executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        elif workers > 1:
+            executor = ThreadPoolExecutor(workers,
+                                          thread_name_prefix='tasks')
+        claimed = done = 0
+        try:
+            while True:
+                count, succeeded = tasks.run_pending(batch, executor)
+                claimed += count
+                done += succeeded
+                if count:
+                    continue
+                if once:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Задач выполнено: {done} из {claimed}'
+        ))
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _warm(image):
+    try:
+        return thumbnails.generate(image) is not None
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры ленты для всех картинок записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько миниатюр создавать параллельно',
+        )
+
+    def handle(self, *args, workers, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True,
+        ).distinct()
+        field = Post._meta.get_field('image')
+        files = [
+            field.attr_class(None, field, name) for name in images.iterator()
+        ]
+        if workers < 2 or thumbnails.run_inline():
+            done = sum(
+                thumbnails.generate(image) is not None for image in files
+            )
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                done = sum(executor.map(_warm, files))
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр готово: {done} из {len(files)}'
+        ))
@@ -0,0 +1,124 @@
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .models import Post
+from .storage import is_content_addressed
+
+IMAGE_FIELD = Post._meta.get_field('image')
+
+
+def _grace():
+    return getattr(settings, 'POSTS_MEDIA_GRACE', 60 * 60)
+
+
+def is_recent(storage, name, grace=None):
+    """Изменялся ли файл за последние grace секунд.
+
+    Такой файл может принадлежать загрузке, чья транзакция еще не
+    закоммичена, поэтому он не удаляется, даже если ссылок на него нет.
+    """
+    grace = _grace() if grace is None else grace
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    return modified > timezone.now() - timedelta(seconds=grace)
+
+
+def field_file(name):
+    return IMAGE_FIELD.attr_class(None, IMAGE_FIELD, name)
+
+
+def referenced_images():
+    return set(Post.objects.exclude(image='').exclude(
+        image__isnull=True,
+    ).values_list('image', flat=True).distinct())
+
+
+def release(*names):
+    """После коммита удаляет файлы, на которые не ссылается ни одна запись.
+
+    Файлы хранилища по хэшу общие для одинаковых загрузок, поэтому
+    удаляются вместе с миниатюрами только после последней ссылки.
+    Недавно загруженный снова файл остается до dedupe_media: ссылку
+    на него может держать еще не закоммиченная транзакция.
+    """
+    names = {name for name in names if is_content_addressed(name)}
+    if not names:
+        return
+
+    def collect():
+        storage = IMAGE_FIELD.storage
+        candidates = {
+            name for name in names if not is_recent(storage, name)
+        }
+        used = set(Post.objects.filter(
+            image__in=candidates,
+        ).values_list('image', flat=True))
+        for name in candidates - used:
+            delete(field_file(name))
+
+    transaction.on_commit(collect)
+
+
+def walk(storage, directory):
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+def known_thumbnails():
+    """Имена файлов миниатюр, которые есть в key-value store sorl."""
+    kvstore = default.kvstore
+    names = set()
+    for key in kvstore._find_keys(identity='thumbnails'):
+        for thumbnail_key in kvstore._get(key, identity='thumbnails') or []:
+            thumbnail = kvstore._get(thumbnail_key)
+            if thumbnail is not None:
+                names.add(thumbnail.name)
+    return names
+
+
+def orphaned_images(grace=None):
+    """Файлы картинок без ссылок, не изменявшиеся grace секунд."""
+    storage = IMAGE_FIELD.storage
+    used = referenced_images()
+    directory = IMAGE_FIELD.upload_to.rstrip('/')
+    return [
+        name for name in walk(storage, directory)
+        if name not in used and not name.endswith('.part')
+        and not is_recent(storage, name, grace)
+    ]
+
+
+def orphaned_thumbnails(grace=None):
+    known = known_thumbnails()
+    prefix = thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/')
+    return [
+        name for name in walk(default.storage, prefix)
+        if name not in known and not is_recent(default.storage, name, grace)
+    ]
+
+
+def deduplicate(name):
+    """Переносит файл в хранилище по хэшу; возвращает новое имя или None."""
+    storage = IMAGE_FIELD.storage
+    try:
+        if is_content_addressed(name) or not storage.exists(name):
+            return None
+    except SuspiciousFileOperation:
+        return None
+    with storage.open(name) as content:
+        return storage.save(name, content)
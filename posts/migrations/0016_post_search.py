@@ -0,0 +1,47 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:25
+
+from django.db import migrations
+
+from posts.stemmer import stems
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX post_text_search ON posts_post "
+            "USING GIN (to_tsvector('russian', text))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5(stems)'
+        )
+        Post = apps.get_model('posts', 'Post')
+        rows = [
+            (pk, ' '.join(stems(text)))
+            for pk, text in Post.objects.values_list('pk', 'text').iterator()
+        ]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, stems) VALUES (%s, %s)',
+                rows,
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX post_text_search')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    limit = getattr(settings, 'POSTS_FANOUT_LIMIT', 1000)
+    UserStats.objects.filter(followers__gt=limit).update(celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='celebrity',
+            field=models.BooleanField(default=False, verbose_name='Популярный автор'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -18,6 +23,20 @@ class Group(models.Model):
         ordering = ['title']
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        comments = Comment.objects.filter(
+            post=OuterRef('pk'),
+        ).order_by().values('post').annotate(
+            count=Count('pk'),
+        ).values('count')
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                Subquery(comments, output_field=IntegerField()), 0,
+            ),
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -43,7 +62,26 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Выберите группу',
     )
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image = models.ImageField(
+        upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+        null=True,
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    _loaded_group_id = None
+    _loaded_image = None
+    # См. posts.publish.defer.
+    _publish_deferred = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
 
     def __str__(self):
         return (
@@ -57,6 +95,14 @@ class Post(models.Model):
         verbose_name = "Запись"
         verbose_name_plural = "Записи"
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'], name='post_author_pub_date',
+            ),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_pub_date',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -89,6 +135,11 @@ class Comment(models.Model):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ('-created', )
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created',
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -105,3 +156,138 @@ class Follow(models.Model):
         verbose_name='Автор',
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='stats',
+    )
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+    posts = models.PositiveIntegerField('Записей', default=0)
+    comments = models.PositiveIntegerField('Комментариев', default=0)
+    # Подписчиков больше POSTS_FANOUT_LIMIT (см. posts.timeline).
+    celebrity = models.BooleanField('Популярный автор', default=False)
+
+    def __str__(self):
+        return f'Статистика: {self.user}'
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Запись',
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    def __str__(self):
+        return f'Лента {self.user}: {self.post_id}'
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        ordering = ('-pub_date', )
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='timeline_user_pub_date',
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author',
+            ),
+        ]
+
+
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=100)
+    payload = models.TextField('Аргументы', default='{}')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        blank=True,
+        null=True,
+    )
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_at = models.DateTimeField('Запуск не раньше', default=timezone.now)
+    locked_until = models.DateTimeField('Занята до', blank=True, null=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}: {self.status}'
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+        ordering = ('run_at', )
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='task_status_run_at',
+            ),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Позиция import_posts в выгрузке.
+
+    Сохраняется в транзакции пачки, поэтому после сбоя --resume не
+    загрузит уже закоммиченную пачку повторно и не пропустит откаченную.
+    """
+    name = models.CharField('Выгрузка', max_length=200, unique=True)
+    offset = models.BigIntegerField('Позиция в файле', default=0)
+    counts = models.TextField('Загружено', default='{}')
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.offset}'
+
+    class Meta:
+        verbose_name = "Позиция импорта"
+        verbose_name_plural = "Позиции импорта"
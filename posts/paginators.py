@@ -0,0 +1,162 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .counters import post_count
+
+PER_PAGE = 10
+COMMENTS_PER_PAGE = 50
+
+
+class CountedPaginator(Paginator):
+    """Paginator, который берет число записей из счетчиков posts.counters."""
+
+    def __init__(self, object_list, per_page, scope, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scope = scope
+
+    @cached_property
+    def count(self):
+        return post_count(self.scope, self.object_list)
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class CursorPaginator:
+    """Keyset-пагинатор по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Страницы идут от новых записей к старым: ``before`` открывает
+    записи старше курсора, ``after`` — новее.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def _key(self, obj):
+        # Строки values() приходят словарями с полем id.
+        if isinstance(obj, dict):
+            return obj[self.field], obj['id']
+        return getattr(obj, self.field), obj.pk
+
+    def encode_cursor(self, obj):
+        value, pk = self._key(obj)
+        raw = f'{value.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            value, pk = raw.decode().rsplit('|', 1)
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if value is None:
+            return None
+        return value, pk
+
+    def _older(self, value, pk):
+        return self.object_list.filter(
+            Q(**{f'{self.field}__lt': value})
+            | Q(**{self.field: value, 'pk__lt': pk})
+        )
+
+    def get_page(self, before=None, after=None):
+        """Страница до курсора before или после курсора after.
+
+        Если после курсора after записей нет (курсор из будущего или
+        новые записи удалены), возвращается первая страница.
+        """
+        before = self.decode_cursor(before)
+        after = self.decode_cursor(after) if before is None else None
+        field = self.field
+        if after is not None:
+            value, pk = after
+            rows = list(self.object_list.filter(
+                Q(**{f'{field}__gt': value})
+                | Q(**{field: value, 'pk__gt': pk})
+            ).order_by(field, 'pk')[:self.per_page + 1])
+            if not rows:
+                return self.get_page()
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            has_next = self._older(*self._key(rows[-1])).exists()
+            return CursorPage(rows, self, has_next, has_previous)
+        queryset = (self.object_list if before is None
+                    else self._older(*before))
+        rows = list(queryset.order_by(f'-{field}', '-pk')[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], self, has_next, before is not None,
+        )
+
+
+def paginate(request, object_list, scope=None, per_page=PER_PAGE):
+    """Возвращает (paginator, page) в режиме settings.POSTS_PAGINATION.
+
+    scope — ключ счетчика записей для режима 'counted'
+    (см. posts.counters.post_scopes).
+    """
+    mode = getattr(settings, 'POSTS_PAGINATION', 'page')
+    if mode == 'cursor':
+        paginator = CursorPaginator(object_list, per_page)
+        page = paginator.get_page(
+            before=request.GET.get('before'),
+            after=request.GET.get('after'),
+        )
+        return paginator, page
+    if mode == 'counted' and scope is not None:
+        paginator = CountedPaginator(object_list, per_page, scope)
+    else:
+        paginator = Paginator(object_list, per_page)
+    return paginator, paginator.get_page(request.GET.get('page'))
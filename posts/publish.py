@@ -0,0 +1,35 @@
+"""Обработка новой записи после публикации в очереди задач.
+
+PostView откладывает раскладку записи по лентам подписчиков, индексацию
+поиска и миниатюры до задачи publish_post, которая ставится в очередь
+после коммита строки Post, — редирект уходит пользователю, не дожидаясь
+этой работы. Счетчики записей и поколения кэша сигнал сдвигает сразу:
+это несколько операций с кэшем, и без них автор не увидел бы запись
+на странице, куда его перенаправили.
+"""
+from . import search, thumbnails, timeline
+from .models import Post
+from .tasks import enqueue_on_commit, task
+
+
+def defer(post):
+    """Помечает несохраненную запись: сигнал оставит работу задаче."""
+    post._publish_deferred = True
+
+
+def schedule(post):
+    """Ставит publish_post для сохраненной записи после коммита."""
+    enqueue_on_commit('publish_post', key=f'publish_post:{post.pk}',
+                      post_id=post.pk)
+
+
+@task('publish_post')
+def publish_post(post_id):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id,
+    ).first()
+    if post is None:
+        return
+    timeline.fan_out([post])
+    search.index_posts([post])
+    thumbnails.schedule(post)
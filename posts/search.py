@@ -0,0 +1,105 @@
+"""Полнотекстовый поиск по записям.
+
+На SQLite основы слов (posts.stemmer) хранятся в таблице FTS5
+posts_post_fts, которая обновляется сигналами Post; на PostgreSQL
+используется GIN-индекс по to_tsvector('russian', text). На остальных
+базах поиск сводится к icontains.
+"""
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .stemmer import WORD, stem, stems
+
+FTS_TABLE = 'posts_post_fts'
+PG_VECTOR = "to_tsvector('russian', posts_post.text)"
+PG_QUERY = "plainto_tsquery('russian', %s)"
+
+
+def _uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def index_posts(posts):
+    """Обновляет записи в индексе FTS5; на других базах ничего не делает."""
+    if not _uses_fts():
+        return
+    rows = [(post.pk, ' '.join(stems(post.text))) for post in posts]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk, _ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, stems) VALUES (%s, %s)', rows,
+        )
+
+
+def remove_posts(pks):
+    if not _uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in pks],
+        )
+
+
+def rebuild_index(batch_size=1000):
+    if not _uses_fts():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    posts = Post.objects.only('pk', 'text').iterator(chunk_size=batch_size)
+    count = 0
+    batch = []
+    for post in posts:
+        batch.append(post)
+        if len(batch) == batch_size:
+            index_posts(batch)
+            count += len(batch)
+            batch = []
+    index_posts(batch)
+    return count + len(batch)
+
+
+def search(query, queryset=None):
+    """Записи, подходящие под запрос, от самых релевантных."""
+    if queryset is None:
+        queryset = Post.objects.for_feed()
+    if connection.vendor == 'sqlite':
+        terms = stems(query)
+        if not terms:
+            return queryset.none()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = posts_post.id',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[' '.join(f'"{term}"' for term in terms)],
+            select={'rank': f'{FTS_TABLE}.rank'},
+            order_by=['rank', '-pub_date'],
+        )
+    if connection.vendor == 'postgresql':
+        return queryset.extra(
+            where=[f'{PG_VECTOR} @@ {PG_QUERY}'],
+            params=[query],
+            select={'rank': f'ts_rank({PG_VECTOR}, {PG_QUERY})'},
+            select_params=[query],
+            order_by=['-rank', '-pub_date'],
+        )
+    return queryset.filter(text__icontains=query)
+
+
+def highlight(text, query):
+    """Экранирует text и выделяет <mark> слова с теми же основами."""
+    terms = set(stems(query))
+    parts = []
+    position = 0
+    for match in WORD.finditer(text):
+        if stem(match.group()) in terms:
+            parts.append(escape(text[position:match.start()]))
+            parts.append(f'<mark>{escape(match.group())}</mark>')
+            position = match.end()
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
@@ -0,0 +1,112 @@
+from threading import local
+
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import caching, counters, media, search, timeline
+from .models import Comment, Follow, Group, Post
+from .stats import change_stats, recount
+
+_deleting = local()
+
+
+def _deleting_posts():
+    """pk записей, которые удаляются в текущем потоке."""
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_post_counts([instance], 1)
+        change_stats(instance.author_id, posts=1)
+        if not instance._publish_deferred:
+            timeline.fan_out([instance])
+    else:
+        counters.move_post(instance, instance._loaded_group_id)
+        if instance._loaded_image != instance.image.name:
+            media.release(instance._loaded_image)
+    if not instance._publish_deferred:
+        search.index_posts([instance])
+    caching.invalidate_post(instance, instance._loaded_group_id)
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = instance.image.name
+    instance._publish_deferred = False
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    """Снимает комментарии удаляемой записи со статистики одним проходом.
+
+    Их каскадное удаление тогда не трогает статистику и кэш по каждому
+    комментарию: страницы записи сбросит post_deleted.
+    """
+    _deleting_posts().add(instance.pk)
+    commenters = Comment.objects.filter(post=instance).order_by().values(
+        'author_id',
+    ).annotate(count=Count('pk')).values_list('author_id', 'count')
+    for author_id, count in commenters:
+        change_stats(author_id, comments=-count)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    counters.change_post_counts([instance], -1)
+    change_stats(instance.author_id, posts=-1)
+    search.remove_posts([instance.pk])
+    caching.invalidate_post(instance)
+    media.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_stats(instance.author_id, comments=1)
+    caching.invalidate_post(instance.post)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts():
+        return
+    change_stats(instance.author_id, comments=-1)
+    caching.invalidate_post(instance.post)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    counters.reset_feed_count(instance.user_id)
+    if created:
+        if not change_stats(instance.author_id, followers=1):
+            recount([instance.author_id])
+        change_stats(instance.user_id, following=1)
+        timeline.reclassify([instance.author_id])
+        timeline.backfill(instance.user_id, instance.author_id)
+    caching.invalidate_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.reset_feed_count(instance.user_id)
+    change_stats(instance.author_id, followers=-1)
+    change_stats(instance.user_id, following=-1)
+    timeline.remove(instance.user_id, instance.author_id)
+    timeline.reclassify([instance.author_id])
+    caching.invalidate_follow(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.invalidate_groups()
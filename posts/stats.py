@@ -0,0 +1,71 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+STAT_FIELDS = ('followers', 'following', 'posts', 'comments')
+
+
+def _count(model, field):
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def with_actual_stats(users):
+    """Аннотирует пользователей точными значениями статистики."""
+    return users.annotate(
+        actual_followers=_count(Follow, 'author'),
+        actual_following=_count(Follow, 'user'),
+        actual_posts=_count(Post, 'author'),
+        actual_comments=_count(Comment, 'author'),
+    )
+
+
+def recount(user_ids):
+    """Пересчитывает статистику пользователей и чинит расхождения.
+
+    Возвращает число созданных или исправленных записей UserStats.
+    """
+    existing = UserStats.objects.in_bulk(user_ids, field_name='user_id')
+    to_create, to_update = [], []
+    users = with_actual_stats(User.objects.filter(pk__in=user_ids))
+    for user in users:
+        actual = {
+            field: getattr(user, f'actual_{field}') for field in STAT_FIELDS
+        }
+        stats = existing.get(user.pk)
+        if stats is None:
+            to_create.append(UserStats(user=user, **actual))
+            continue
+        if any(getattr(stats, k) != v for k, v in actual.items()):
+            for field, value in actual.items():
+                setattr(stats, field, value)
+            to_update.append(stats)
+    UserStats.objects.bulk_create(to_create, ignore_conflicts=True)
+    UserStats.objects.bulk_update(to_update, STAT_FIELDS)
+    return len(to_create) + len(to_update)
+
+
+def get_stats(user):
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        recount([user.pk])
+        stats = UserStats.objects.get(user=user)
+    return stats
+
+
+def change_stats(user_id, **deltas):
+    """Сдвигает счетчики пользователя одним UPDATE; вернет 0 без записи.
+
+    Отсутствующая запись не создается: ее посчитает get_stats при
+    первом показе профиля. Уменьшение не опускает счетчик ниже нуля —
+    расхождение, из-за которого это могло бы случиться, исправит
+    recount_stats.
+    """
+    return UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta if delta >= 0
+        else Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+    })
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_NAME = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    return bool(name and CONTENT_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под SHA-256 его содержимого: <каталог>/ab/abcd….jpg.
+
+    Хэш считается при потоковой записи во временный файл, после чего тот
+    переименовывается; если такой файл уже есть, повторная загрузка
+    ссылается на него, и миниатюры sorl для него тоже общие, а время
+    изменения файла обновляется.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Окончательное имя известно только после чтения содержимого.
+        return name
+
+    def _save(self, name, content):
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        os.makedirs(self.path(directory or '.'), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.path(directory or '.'), suffix='.part',
+        )
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(descriptor, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = posixpath.join(
+                directory, hexdigest[:2], hexdigest + extension,
+            )
+            path = self.path(name)
+            try:
+                # Свежее время изменения не дает release и dedupe_media
+                # удалить файл, пока запись с ним не закоммичена.
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, path)
+            else:
+                os.remove(temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
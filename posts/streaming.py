@@ -0,0 +1,39 @@
+"""Потоковая отдача страниц с длинными списками.
+
+Страница рендерится один раз с меткой на месте списка и делится по ней:
+клиент сразу получает начало страницы, затем список пачками по keyset
+и конец страницы. В памяти одновременно держится только одна пачка.
+"""
+from uuid import uuid4
+
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
+
+from .paginators import COMMENTS_PER_PAGE, CursorPaginator
+
+
+def render_stream(request, template_name, context, key, chunks):
+    """Ответ, где context[key] в шаблоне заменен строками из chunks."""
+    marker = uuid4().hex
+    head, tail = render_to_string(
+        template_name, {**context, key: marker}, request,
+    ).split(marker, 1)
+
+    def content():
+        yield head
+        yield from chunks
+        yield tail
+
+    return StreamingHttpResponse(content())
+
+
+def comment_chunks(comments, batch_size=COMMENTS_PER_PAGE):
+    """HTML всех комментариев пачками от новых к старым."""
+    paginator = CursorPaginator(comments, batch_size, field='created')
+    cursor = None
+    while True:
+        page = paginator.get_page(before=cursor)
+        yield render_to_string('comment_list.html', {'comments': page})
+        if not page.has_next():
+            return
+        cursor = page.next_cursor
@@ -0,0 +1,150 @@
+"""Очередь фоновых задач в таблице Task.
+
+Функция задачи регистрируется декоратором task, а enqueue кладет строку
+с именем, JSON-аргументами и необязательным ключом идемпотентности:
+пока строка с тем же ключом есть в таблице, вторая не создается.
+Задачи выполняет команда run_tasks пулом потоков или процессов. Каждая
+задача идет в своей транзакции; упавшая повторяется с растущей вдвое
+задержкой, пока не кончатся TASKS_MAX_ATTEMPTS попыток, поэтому функции
+задач должны быть идемпотентными. При TASKS_ALWAYS_EAGER задача
+выполняется сразу в вызвавшем процессе; ее ошибка только пишется в лог,
+чтобы не превратить уже сохраненную запись в ответ 500.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def _max_attempts():
+    return getattr(settings, 'TASKS_MAX_ATTEMPTS', 5)
+
+
+def _retry_delay():
+    return getattr(settings, 'TASKS_RETRY_DELAY', 10)
+
+
+def _lease():
+    return getattr(settings, 'TASKS_LEASE', 300)
+
+
+def task(name):
+    """Регистрирует функцию задачи под именем name."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, delay=0, **payload):
+    """Ставит задачу name(**payload) в очередь через delay секунд.
+
+    payload должен сериализоваться в JSON. Если задача с таким key уже
+    есть в таблице, новая не создается.
+    """
+    if name not in TASKS:
+        raise LookupError(f'Неизвестная задача {name}')
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        try:
+            with transaction.atomic():
+                TASKS[name](**payload)
+        except Exception:
+            logger.exception('Задача %s завершилась ошибкой', name)
+        return
+    Task.objects.bulk_create([Task(
+        name=name,
+        key=key,
+        payload=json.dumps(payload),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )], ignore_conflicts=True)
+
+
+def enqueue_on_commit(name, key=None, **payload):
+    """enqueue после коммита текущей транзакции."""
+    transaction.on_commit(lambda: enqueue(name, key, **payload))
+
+
+def claim(limit):
+    """Занимает до limit готовых задач и возвращает их pk.
+
+    Готова задача из очереди, чье время пришло, и задача, воркер которой
+    не уложился в TASKS_LEASE секунд — например, упал.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    ).order_by('run_at').values_list('pk', 'status', 'locked_until')
+    claimed = []
+    for pk, status, locked_until in candidates[:limit]:
+        # Условный UPDATE: из нескольких воркеров задачу получит один.
+        if Task.objects.filter(
+            pk=pk, status=status, locked_until=locked_until,
+        ).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(seconds=_lease()),
+            attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def execute(pk):
+    """Выполняет занятую задачу pk; возвращает True при успехе."""
+    task = Task.objects.get(pk=pk)
+    try:
+        func = TASKS.get(task.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача {task.name}')
+        with transaction.atomic():
+            func(**json.loads(task.payload))
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', task)
+        error = traceback.format_exc()
+        if task.attempts >= _max_attempts():
+            Task.objects.filter(pk=pk).update(
+                status=Task.FAILED, locked_until=None, last_error=error,
+            )
+        else:
+            delay = _retry_delay() * 2 ** (task.attempts - 1)
+            Task.objects.filter(pk=pk).update(
+                status=Task.QUEUED,
+                locked_until=None,
+                last_error=error,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+        return False
+    Task.objects.filter(pk=pk).update(status=Task.DONE, locked_until=None)
+    return True
+
+
+def execute_in_worker(pk):
+    try:
+        return execute(pk)
+    finally:
+        connection.close()
+
+
+def run_pending(limit=100, executor=None):
+    """Выполняет до limit готовых задач; возвращает (взято, успешно).
+
+    executor — пул потоков или процессов; без него задачи выполняются
+    по очереди в текущем потоке.
+    """
+    pks = claim(limit)
+    if executor is None:
+        done = sum(execute(pk) for pk in pks)
+    else:
+        done = sum(executor.map(execute_in_worker, pks))
+    return len(pks), done
@@ -1,8 +1,43 @@
 from django import template
 
+from posts import search, thumbnails
+
 register = template.Library()
 
 
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def highlight(text, query):
+    return search.highlight(text, query)
+
+
+@register.filter
+def page_window(page, on_each_side=2):
+    """Номера страниц вокруг текущей плюс первая и последняя.
+
+    None обозначает пропуск, чтобы не выводить тысячи ссылок.
+    """
+    last = page.paginator.num_pages
+    start = max(page.number - on_each_side, 1)
+    end = min(page.number + on_each_side, last)
+    window = []
+    if start > 1:
+        window.append(1)
+        if start > 2:
+            window.append(None)
+    window.extend(range(start, end + 1))
+    if end < last:
+        if end < last - 1:
+            window.append(None)
+        window.append(last)
+    return window
+
+
+@register.simple_tag
+def feed_image(post):
+    """Варианты картинки для ленты или None, пока они создаются в фоне."""
+    return thumbnails.feed_image(post)
@@ -0,0 +1,157 @@
+import base64
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+NAME_1 = 'test_user'
+NAME_2 = 'user-2'
+SLUG = 'test-slug'
+INDEX_URL = reverse('api:index')
+GROUP_URL = reverse('api:group', kwargs={'slug': SLUG})
+FOLLOW_URL = reverse('api:follow_index')
+PROFILE_URL = reverse('api:profile', kwargs={'username': NAME_1})
+FUTURE_CURSOR = base64.urlsafe_b64encode(
+    b'2099-01-01T00:00:00+00:00|999').decode().rstrip('=')
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1,
+                                            first_name='Лев',
+                                            last_name='Толстой')
+        cls.user_2 = User.objects.create_user(username=NAME_2)
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug=SLUG,
+            description='Текст',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}',
+                                group=cls.group)
+            for number in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.user_2, text='Да')
+        Follow.objects.create(user=cls.user_2, author=cls.user)
+        cls.POST_URL = reverse('api:post', kwargs={
+            'username': NAME_1, 'post_id': cls.post.id,
+        })
+        cls.COMMENTS_URL = reverse('api:comments', kwargs={
+            'username': NAME_1, 'post_id': cls.post.id,
+        })
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get_json(self, url, data=None, client=None, status=200):
+        response = (client or self.guest_client).get(url, data)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content)
+
+    def test_feeds(self):
+        """Ленты отдают записи от новых к старым с полями по умолчанию."""
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url):
+                data = self.get_json(url)
+                self.assertEqual(
+                    [item['id'] for item in data['results']],
+                    [post.id for post in reversed(self.posts)],
+                )
+                item = data['results'][0]
+                self.assertEqual(item['author'], NAME_1)
+                self.assertEqual(item['group'], SLUG)
+                self.assertEqual(item['comments'], 1)
+                self.assertIsNone(item['image'])
+        self.assertEqual(self.get_json(GROUP_URL)['group']['title'],
+                         self.group.title)
+        author = self.get_json(PROFILE_URL)['author']
+        self.assertEqual(author['full_name'], 'Лев Толстой')
+        self.assertEqual(author['posts'], 3)
+
+    def test_rows_in_one_query(self):
+        """Страница ленты читается одним запросом без объектов моделей."""
+        self.get_json(INDEX_URL)
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.get_json(INDEX_URL)
+
+    def test_cursor_pagination(self):
+        first = self.get_json(INDEX_URL, {'limit': 2})
+        self.assertIsNone(first['previous'])
+        second = self.get_json(INDEX_URL, {'limit': 2,
+                                           'before': first['next']})
+        self.assertEqual([item['id'] for item in second['results']],
+                         [self.posts[0].id])
+        self.assertIsNone(second['next'])
+        back = self.get_json(INDEX_URL, {'limit': 2,
+                                         'after': second['previous']})
+        self.assertEqual(back['results'], first['results'])
+
+    def test_empty_after_page(self):
+        """Курсор after без более новых строк открывает первую страницу."""
+        for url in (INDEX_URL, self.COMMENTS_URL):
+            with self.subTest(url):
+                data = self.get_json(url, {'limit': 2,
+                                           'after': FUTURE_CURSOR})
+                self.assertTrue(data['results'])
+                self.assertIsNone(data['previous'])
+
+    def test_field_selection(self):
+        data = self.get_json(INDEX_URL, {'fields': 'text,id'})
+        self.assertEqual(data['results'][0],
+                         {'text': self.post.text, 'id': self.post.id})
+        error = self.get_json(INDEX_URL, {'fields': 'id,password'},
+                              status=400)
+        self.assertIn('password', error['detail'])
+        self.get_json(INDEX_URL, {'limit': 1000}, status=400)
+
+    def test_compact_gzip_output(self):
+        response = self.guest_client.get(INDEX_URL,
+                                         HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(response.content).decode()
+        self.assertNotIn(', ', body.replace(self.post.text, ''))
+        self.assertIn('"author":"test_user"', body)
+
+    def test_post_and_comments(self):
+        post = self.get_json(self.POST_URL, {'fields': 'id,comments'})
+        self.assertEqual(post, {'post': {'id': self.post.id,
+                                         'comments': 1}})
+        comments = self.get_json(self.COMMENTS_URL)['results']
+        self.assertEqual(len(comments), 1)
+        self.assertEqual(comments[0]['author'], NAME_2)
+        self.assertEqual(comments[0]['text'], 'Да')
+
+    def test_follow_feed(self):
+        self.get_json(FOLLOW_URL, status=401)
+        client = Client()
+        client.force_login(self.user_2)
+        data = self.get_json(FOLLOW_URL, client=client)
+        self.assertEqual(len(data['results']), 3)
+
+    def test_not_found_is_json(self):
+        for url in (
+            reverse('api:group', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+            reverse('api:post', kwargs={'username': NAME_2,
+                                        'post_id': self.post.id}),
+            reverse('api:comments', kwargs={'username': NAME_1,
+                                            'post_id': 0}),
+        ):
+            with self.subTest(url):
+                self.assertEqual(self.get_json(url, status=404)['detail'],
+                                 'Не найдено')
+
+    def test_read_only(self):
+        response = self.guest_client.post(INDEX_URL)
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
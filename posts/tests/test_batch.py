@@ -0,0 +1,156 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.stats import get_stats
+
+BATCH_POSTS_URL = reverse('api:batch_posts')
+BATCH_COMMENTS_URL = reverse('api:batch_comments')
+INDEX_URL = reverse('index')
+SLUG = 'test-slug'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class BatchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug=SLUG,
+            description='Текст',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def post_json(self, url, items, client=None):
+        return (client or self.client).post(
+            url, json.dumps({'items': items}),
+            content_type='application/json',
+        )
+
+    def test_creates_posts_with_per_item_results(self):
+        """Пакет вставляет верные записи и сообщает об ошибках остальных."""
+        get_stats(self.user)
+        response = self.post_json(BATCH_POSTS_URL, [
+            {'text': 'Первый', 'group': self.group.pk},
+            {'text': ''},
+            {'text': 'Второй', 'group': 0},
+            {'text': 'Третий'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.content)
+        self.assertEqual(data['created'], 2)
+        first, empty, wrong_group, third = data['results']
+        self.assertIn('text', empty['errors'])
+        self.assertIn('group', wrong_group['errors'])
+        post = Post.objects.get(pk=first['id'])
+        self.assertEqual((post.text, post.author, post.group),
+                         ('Первый', self.user, self.group))
+        self.assertTrue(Post.objects.filter(pk=third['id']).exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2,
+        )
+        self.assertEqual(get_stats(self.user).posts, 2)
+
+    def test_batch_queries_do_not_grow_with_size(self):
+        """Число запросов пакета не зависит от числа элементов."""
+        def queries(size):
+            with CaptureQueriesContext(connection) as context:
+                self.post_json(BATCH_POSTS_URL, [
+                    {'text': f'Текст {number}', 'group': self.group.pk}
+                    for number in range(size)
+                ])
+            return [query['sql'] for query in context.captured_queries]
+        self.assertEqual(len(queries(2)), len(queries(20)))
+
+    def test_invalidates_pages_once(self):
+        self.client.get(INDEX_URL)
+        self.post_json(BATCH_POSTS_URL, [{'text': 'Новая запись'}])
+        self.assertContains(self.client.get(INDEX_URL), 'Новая запись')
+
+    def test_creates_comments(self):
+        post = Post.objects.create(author=self.follower, text='Текст')
+        response = self.post_json(BATCH_COMMENTS_URL, [
+            {'post': post.pk, 'text': 'Да'},
+            {'post': 0, 'text': 'Нет'},
+            {'post': post.pk, 'text': 'Еще'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        results = json.loads(response.content)['results']
+        self.assertIn('post', results[1]['errors'])
+        self.assertEqual(
+            list(post.comments.order_by('pk').values_list('text', 'author')),
+            [('Да', self.user.pk), ('Еще', self.user.pk)],
+        )
+
+    def test_rejected_requests(self):
+        self.assertEqual(
+            self.post_json(BATCH_POSTS_URL, [{'text': 'Текст'}],
+                           client=Client()).status_code,
+            401,
+        )
+        self.assertEqual(self.client.get(BATCH_POSTS_URL).status_code, 405)
+        for body in ('не json', json.dumps({'items': []}),
+                     json.dumps({'items': [1]})):
+            with self.subTest(body):
+                response = self.client.post(
+                    BATCH_COMMENTS_URL, body,
+                    content_type='application/json',
+                )
+                self.assertEqual(response.status_code, 400)
+        response = self.post_json(BATCH_COMMENTS_URL, [{'text': 'Да'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Comment.objects.exists())
+
+
+class BatchThumbnailTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_thumbnails_are_scheduled_after_commit(self):
+        """Миниатюры записей пакета с картинками ставятся в очередь
+        после коммита, как и для записи из формы."""
+        client = Client()
+        client.force_login(User.objects.create_user(username='test_user'))
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            response = client.post(BATCH_POSTS_URL, {
+                'items': json.dumps([
+                    {'text': 'С картинкой'}, {'text': 'Без картинки'},
+                ]),
+                'image-0': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, 'image/gif',
+                ),
+            })
+        self.assertEqual(response.status_code, 201)
+        scheduled = [call.args[0] for call in schedule.call_args_list]
+        self.assertEqual(
+            [post.text for post in scheduled if post.image], ['С картинкой'],
+        )
@@ -0,0 +1,26 @@
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import Post, User
+
+
+class BenchmarkTest(TestCase):
+    def test_seed_and_measure(self):
+        """Замер возвращает метрики для каждого view."""
+        dataset = benchmark.seed(users=5, groups=2, posts=20, follows=2)
+        self.assertEqual(dataset['posts'], Post.objects.count())
+        self.assertEqual(User.objects.count(), 5)
+        results = benchmark.measure(iterations=2)
+        self.assertEqual(set(results), set(benchmark.VIEWS))
+        for name, result in results.items():
+            with self.subTest(name):
+                self.assertEqual(result['requests'], 2)
+                self.assertGreater(result['queries_max'], 0)
+                self.assertLessEqual(result['p50_ms'], result['max_ms'])
+
+    def test_compare_reports_regressions(self):
+        baseline = {'index': {'p95_ms': 10, 'queries_max': 3}}
+        self.assertEqual(benchmark.compare(
+            {'index': {'p95_ms': 12, 'queries_max': 3}}, baseline), [])
+        self.assertEqual(len(benchmark.compare(
+            {'index': {'p95_ms': 20, 'queries_max': 4}}, baseline)), 2)
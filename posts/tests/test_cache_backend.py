@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from yatube.cache import LocalTier, TieredCache
+
+TIERED_PARAMS = {'OPTIONS': {'SYNC_INTERVAL': 0}}
+
+
+class TieredCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.SHARED_CACHES = {
+            'db': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'test_cache_table',
+            },
+            'file': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cls.cache_dir,
+            },
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def workers(self):
+        """Два воркера с общим кэшем и собственными LRU."""
+        worker_1 = TieredCache('shared', TIERED_PARAMS)
+        worker_2 = TieredCache('shared', TIERED_PARAMS)
+        worker_1.local = LocalTier(100, 30)
+        worker_2.local = LocalTier(100, 30)
+        return worker_1, worker_2
+
+    def run_for_backends(self, check):
+        for name, config in self.SHARED_CACHES.items():
+            with self.subTest(backend=name):
+                with override_settings(CACHES={
+                    'default': config,
+                    'shared': config,
+                }):
+                    call_command('createcachetable', verbosity=0)
+                    caches['shared'].clear()
+                    check(*self.workers())
+
+    def test_write_invalidates_other_workers(self):
+        """Запись одного воркера видна другому воркеру."""
+        def check(worker_1, worker_2):
+            worker_1.set('key', 'old')
+            self.assertEqual(worker_2.get('key'), 'old')
+            worker_1.set('key', 'new')
+            self.assertEqual(worker_2.get('key'), 'new')
+            worker_1.delete('key')
+            self.assertIsNone(worker_2.get('key'))
+            worker_1.set_many({'a': 1, 'b': 2})
+            self.assertEqual(worker_2.get_many(['a', 'b']), {'a': 1, 'b': 2})
+            worker_1.incr('a')
+            self.assertEqual(worker_2.get('a'), 2)
+        self.run_for_backends(check)
+
+    def test_clear_empties_other_workers(self):
+        """clear() одного воркера сбрасывает LRU остальных."""
+        def check(worker_1, worker_2):
+            caches['shared'].set('key', 'value')
+            self.assertEqual(worker_2.get('key'), 'value')
+            worker_1.clear()
+            self.assertIsNone(worker_2.get('key'))
+            worker_1.set('other', 'value')
+            caches['shared'].set('key', 'value')
+            self.assertEqual(worker_2.get('key'), 'value')
+            worker_1.clear()
+            self.assertIsNone(worker_2.get('key'))
+        self.run_for_backends(check)
+
+    def test_local_tier_serves_repeated_reads(self):
+        def check(worker_1, worker_2):
+            worker_1.set('key', 'value')
+            self.assertEqual(worker_2.get('key'), 'value')
+            caches['shared'].delete('key')
+            self.assertEqual(worker_2.get('key'), 'value')
+        self.run_for_backends(check)
+
+    def test_incr_of_missing_key_raises(self):
+        def check(worker_1, worker_2):
+            with self.assertRaises(ValueError):
+                worker_1.incr('missing')
+        self.run_for_backends(check)
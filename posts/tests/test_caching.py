@@ -0,0 +1,183 @@
+import time
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from context_processors.groups import groups
+from posts.caching import group_by_slug, group_list
+from posts.models import Comment, Follow, Group, Post, User
+
+INDEX_URL = reverse('index')
+INDEX_PAGE_2_URL = INDEX_URL + '?page=2'
+NAME_1 = 'test_user'
+NAME_2 = 'user-2'
+SLUG = 'test-slug'
+GROUP_URL = reverse('group', kwargs={'slug': SLUG})
+PROFILE_URL = reverse('profile', kwargs={'username': NAME_1})
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1)
+        cls.user_2 = User.objects.create_user(username=NAME_2)
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug=SLUG,
+            description='Текст',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Первый пост',
+            group=cls.group,
+        )
+        cls.POST_URL = reverse('post', kwargs={
+            'username': NAME_1,
+            'post_id': cls.post.id,
+        })
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_pages_are_served_from_cache(self):
+        """Повторный запрос страницы не обращается к базе."""
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL, self.POST_URL):
+            with self.subTest(url):
+                content = self.guest_client.get(url).content
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.content, content)
+
+    def test_page_number_is_part_of_key(self):
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Text') for _ in range(10)]
+        )
+        first = self.guest_client.get(INDEX_URL).content
+        second = self.guest_client.get(INDEX_PAGE_2_URL).content
+        self.assertNotEqual(first, second)
+
+    def test_new_post_invalidates_feeds(self):
+        """Новая запись сразу видна в ленте, группе и профиле."""
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL):
+            self.guest_client.get(url)
+        Post.objects.create(author=self.user, text='Свежий пост',
+                            group=self.group)
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url):
+                self.assertContains(self.guest_client.get(url), 'Свежий пост')
+
+    def test_comment_invalidates_post_page(self):
+        self.guest_client.get(self.POST_URL)
+        Comment.objects.create(post=self.post, author=self.user_2,
+                               text='Новый комментарий')
+        self.assertContains(
+            self.guest_client.get(self.POST_URL), 'Новый комментарий')
+
+    def test_follow_invalidates_profile(self):
+        self.guest_client.get(PROFILE_URL)
+        Follow.objects.create(user=self.user_2, author=self.user)
+        self.assertContains(
+            self.guest_client.get(PROFILE_URL), 'Подписчиков: 1')
+
+    def test_group_change_invalidates_pages(self):
+        self.guest_client.get(INDEX_URL)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.guest_client.get(INDEX_URL), 'Новое название')
+
+
+class ConditionalResponseTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1)
+        cls.group = Group.objects.create(title='Группа', slug=SLUG,
+                                         description='Текст')
+        cls.post = Post.objects.create(author=cls.user, text='Первый пост',
+                                       group=cls.group)
+        cls.POST_URL = reverse('post', kwargs={
+            'username': NAME_1,
+            'post_id': cls.post.id,
+        })
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_not_modified(self):
+        """Без изменений страница отвечает 304 без запросов к базе."""
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL, self.POST_URL):
+            with self.subTest(url):
+                response = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    etag_response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                    date_response = self.guest_client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(etag_response.status_code, 304)
+                self.assertEqual(date_response.status_code, 304)
+                self.assertEqual(etag_response['ETag'], response['ETag'])
+
+    def test_missing_page_ignores_if_modified_since(self):
+        """Несуществующая страница отвечает 404 и на If-Modified-Since."""
+        for url in (
+            reverse('post', kwargs={'username': NAME_1, 'post_id': 0}),
+            reverse('profile', kwargs={'username': 'missing'}),
+        ):
+            with self.subTest(url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 3600))
+                self.assertEqual(response.status_code, 404)
+
+    def test_post_edit_changes_validators(self):
+        etag = self.guest_client.get(self.POST_URL)['ETag']
+        author_client = Client()
+        author_client.force_login(self.user)
+        author_client.post(
+            reverse('post_edit', kwargs={
+                'username': NAME_1, 'post_id': self.post.id,
+            }),
+            {'text': 'Исправленный пост', 'group': self.group.id},
+        )
+        response = self.guest_client.get(self.POST_URL,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный пост')
+
+
+class GroupListCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug=SLUG,
+            description='Текст',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_list_is_cached(self):
+        """Список групп читается из базы один раз до изменения групп."""
+        self.assertEqual([g['slug'] for g in group_list()], [SLUG])
+        with self.assertNumQueries(0):
+            group_list()
+            self.assertEqual(group_by_slug(SLUG), self.group)
+            self.assertIsNone(group_by_slug('not-exist'))
+        Group.objects.create(title='Вторая', slug='second', description='')
+        self.assertEqual(group_by_slug('second').title, 'Вторая')
+
+    def test_unknown_group_returns_404(self):
+        response = Client().get(reverse('group', kwargs={'slug': 'nope'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_context_processor_is_lazy(self):
+        """Контекстный процессор не запрашивает группы сам по себе."""
+        with self.assertNumQueries(0):
+            context = groups(None)
+        self.assertEqual(len(context['group_list']), 1)
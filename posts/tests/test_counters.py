@@ -0,0 +1,105 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.counters import _key, post_count
+from posts.models import Follow, Group, Post, User
+from posts.paginators import CountedPaginator
+from posts.templatetags.post_filters import page_window
+
+INDEX_URL = reverse('index')
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.user_2 = User.objects.create_user(username='user-2')
+        cls.group = Group.objects.create(
+            title='Группа1',
+            slug='test-slug',
+            description='Текст',
+        )
+        cls.new_group = Group.objects.create(
+            title='Группа2',
+            slug='new-slug',
+            description='Текст',
+        )
+        Follow.objects.create(user=cls.user_2, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.SCOPES = {
+            'all': Post.objects.all(),
+            f'author:{self.user.id}': self.user.posts.all(),
+            f'group:{self.group.id}': self.group.posts.all(),
+            f'group:{self.new_group.id}': self.new_group.posts.all(),
+            f'feed:{self.user_2.id}': Post.objects.filter(
+                author__following__user=self.user_2),
+        }
+        for scope, queryset in self.SCOPES.items():
+            post_count(scope, queryset)
+
+    def assertCountersMatch(self):
+        for scope, queryset in self.SCOPES.items():
+            with self.subTest(scope):
+                with self.assertNumQueries(0):
+                    count = post_count(scope, queryset)
+                self.assertEqual(count, queryset.count())
+
+    def test_counters_follow_create_edit_delete(self):
+        """Счетчики обновляются при создании, переносе и удалении поста."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group)
+        self.assertCountersMatch()
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.new_group
+        post.save()
+        self.assertCountersMatch()
+        post.delete()
+        self.assertCountersMatch()
+
+    def test_follow_resets_feed_counter(self):
+        Post.objects.create(author=self.user, text='Текст')
+        Follow.objects.filter(user=self.user_2).delete()
+        self.assertEqual(
+            post_count(f'feed:{self.user_2.id}', Post.objects.none()), 0)
+
+    @override_settings(POSTS_COUNT_TIMEOUT=60)
+    def test_counter_is_recounted_every_period(self):
+        """Разошедшийся с базой счетчик пересчитывается в новом периоде."""
+        Post.objects.create(author=self.user, text='Текст')
+        with mock.patch('posts.counters.time') as clock:
+            clock.time.return_value = time.time() // 60 * 60
+            cache.set(_key('all'), 100)
+            self.assertEqual(post_count('all', Post.objects.all()), 100)
+            clock.time.return_value += 60
+            self.assertEqual(post_count('all', Post.objects.all()), 1)
+
+    @override_settings(POSTS_PAGINATION='counted')
+    def test_index_uses_counted_paginator(self):
+        Post.objects.create(author=self.user, text='Текст')
+        response = Client().get(INDEX_URL)
+        self.assertIsInstance(response.context['paginator'], CountedPaginator)
+        self.assertEqual(response.context['paginator'].count, 1)
+
+
+class PageWindowTest(TestCase):
+    def test_page_window(self):
+        """Список страниц сокращается вокруг текущей."""
+        paginator = Paginator(range(1000), 10)
+        cases = {
+            1: [1, 2, 3, None, 100],
+            4: [1, 2, 3, 4, 5, 6, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number):
+                self.assertEqual(
+                    page_window(paginator.page(number)), expected)
@@ -0,0 +1,94 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateFakeDataTest(TestCase):
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, *args):
+        call_command(
+            'generate_fake_data', '--users', '40', '--groups', '5',
+            '--posts', '300', '--batch-size', '70', '--follows', '5',
+            *args, stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'image')),
+            list(Follow.objects.order_by('pk').values_list(
+                'user__username', 'author__username')),
+            Comment.objects.count(),
+        )
+
+    def test_counts_and_power_law(self):
+        """Создаются все объекты, первые авторы самые популярные."""
+        self.generate('--image-fraction', '0.5')
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertGreater(Comment.objects.count(), 0)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertTrue(Post.objects.filter(group=None).exists())
+        authors = Counter(Post.objects.values_list(
+            'author__username', flat=True))
+        self.assertEqual(authors.most_common(1)[0][0], 'fake0')
+        self.assertGreater(authors['fake0'], 300 / 40 * 3)
+        followers = Counter(Follow.objects.values_list(
+            'author__username', flat=True))
+        self.assertEqual(followers.most_common(1)[0][0], 'fake0')
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(User.objects.get(username='fake0').stats.posts,
+                         authors['fake0'])
+
+    def test_same_seed_same_data(self):
+        self.generate('--seed', '7', '--image-fraction', '0')
+        first = self.snapshot()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.generate('--seed', '7', '--image-fraction', '0')
+        self.assertEqual(self.snapshot(), first)
+
+
+class ParallelWorkersTest(SimpleTestCase):
+    def test_workers_share_file_database(self):
+        """С --workers 2 процессы пула пишут в ту же базу, что и родитель.
+
+        Тестовая база в памяти не видна дочерним процессам, поэтому команда
+        запускается отдельно на временном файле SQLite.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        env = {**os.environ, 'DB_NAME': os.path.join(directory, 'db.sqlite3')}
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        for command in (
+            ['migrate'],
+            ['generate_fake_data', '--users', '40', '--groups', '5',
+             '--posts', '300', '--batch-size', '70', '--follows', '5',
+             '--image-fraction', '0', '--workers', '2'],
+        ):
+            subprocess.run([sys.executable, manage, *command], env=env,
+                           check=True, capture_output=True)
+        with sqlite3.connect(env['DB_NAME']) as database:
+            posts, = database.execute(
+                'SELECT COUNT(*) FROM posts_post').fetchone()
+            stats, = database.execute(
+                'SELECT SUM(posts) FROM posts_userstats').fetchone()
+        self.assertEqual((posts, stats), (300, 300))
@@ -1,12 +1,13 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django import forms
-from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm
 from posts.models import Comment, Group, Post, User
@@ -19,7 +20,9 @@ LOGIN_URL_NEXT_NEW_POST = (reverse('login') + f'?next={NEW_POST_URL}')
 class PostCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
         super().setUpClass()
         cls.user = User.objects.create_user(username='test_user')
         cls.group = Group.objects.create(
@@ -36,8 +39,9 @@ class PostCreateFormTests(TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
 
     def setUp(self):
         self.guest_client = Client()
@@ -231,3 +235,82 @@ class PostCreateFormTests(TestCase):
         cache.clear()
         response = self.authorized_client.get(INDEX_URL)
         self.assertNotEqual(content, response.content)
+
+
+@override_settings(POSTS_IMAGE_MAX_SIDE=150)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    @staticmethod
+    def photo(size=(300, 100), orientation=6):
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        content = BytesIO()
+        Image.new('RGB', size, 'red').save(content, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpeg', content.getvalue(),
+                                  content_type='image/jpeg')
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            NEW_POST_URL, data={'text': 'Фото', 'image': image},
+        )
+
+    def test_image_is_normalized(self):
+        """Картинка повернута по EXIF, уменьшена и сохранена без EXIF."""
+        self.create_post(self.photo())
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (50, 150))
+            self.assertNotIn('exif', image.info)
+
+    @override_settings(POSTS_UPLOAD_MAX_BYTES=100)
+    def test_oversized_upload_is_rejected(self):
+        response = self.create_post(self.photo())
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(response, 'form', 'image',
+                             'Файл больше 100\xa0байт.')
+
+    def test_csrf_is_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(NEW_POST_URL, {'text': 'Без токена'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_UPLOAD_MAX_BYTES=100)
+    def test_upload_limit_only_applies_to_post_forms(self):
+        """Загрузка в админке не обрывается лимитом форм записей."""
+        admin = User.objects.create_superuser('admin', 'admin@yatube.ru',
+                                              'password')
+        self.authorized_client.force_login(admin)
+        response = self.authorized_client.post(
+            reverse('admin:posts_post_add'),
+            {'text': 'Из админки', 'author': admin.pk,
+             'image': self.photo()},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Post.objects.get().image)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_is_rejected(self):
+        response = self.create_post(self.photo())
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(response, 'form', 'image',
+                             'Картинка больше 1000 пикселей.')
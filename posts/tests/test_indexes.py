@@ -0,0 +1,50 @@
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from posts.models import Follow, Group, Post, User
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.user_2 = User.objects.create_user(username='user-2')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Текст',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_hot_queries_use_composite_indexes(self):
+        """Горячие запросы используют составные индексы без сортировки."""
+        # SQLite создает UNIQUE-ограничение как автоматический индекс,
+        # поэтому для Follow проверяется поиск по обоим полям.
+        querysets = {
+            'INDEX post_author_pub_date': self.user.posts.for_feed()[:10],
+            'INDEX post_group_pub_date': self.group.posts.for_feed()[:10],
+            'INDEX comment_post_created': self.post.comments.all()[:10],
+            '(user_id=? AND author_id=?)': Follow.objects.filter(
+                user=self.user, author=self.user_2),
+        }
+        for expected, queryset in querysets.items():
+            with self.subTest(expected):
+                plan = self.explain(queryset)
+                self.assertIn(expected, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(user=self.user, author=self.user_2)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=self.user_2)
@@ -0,0 +1,78 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube.metrics import registry
+
+INDEX_URL = reverse('index')
+METRICS_URL = reverse('metrics')
+
+
+class MetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.create(author=cls.user, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def test_prometheus_endpoint(self):
+        """Метрики запроса попадают в гистограммы и счетчики view."""
+        Client().get(INDEX_URL)
+        Client().get(INDEX_URL)
+        body = Client().get(METRICS_URL).content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 2', body)
+        self.assertIn('yatube_requests_total{view="index",status="200"} 2',
+                      body)
+        self.assertIn('yatube_response_bytes_bucket{view="index",le="+Inf"}',
+                      body)
+        self.assertIn(
+            'yatube_cache_requests_total{view="index",result="hit"}', body)
+        self.assertIn(
+            'yatube_cache_requests_total{view="index",result="miss"}', body)
+
+    def test_metrics_closed_for_other_addresses(self):
+        response = Client(REMOTE_ADDR='10.0.0.1').get(METRICS_URL)
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_LOG_REQUESTS=True)
+    def test_structured_log(self):
+        with self.assertLogs('yatube.metrics') as logs:
+            Client().get(INDEX_URL)
+            content = Client().get(INDEX_URL).content
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'index')
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['bytes'], len(content))
+
+    @override_settings(METRICS_PROFILE_VIEW='index', METRICS_PROFILE_RATE=2)
+    def test_profile_sampling(self):
+        """Под cProfile выполняется каждый N-й вызов выбранного view."""
+        client = Client()
+        with self.assertLogs('yatube.metrics') as logs:
+            for _ in range(4):
+                client.get(INDEX_URL)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('Профиль index', logs.records[0].getMessage())
+
+    @override_settings(METRICS_PROFILE_VIEW='add_comment',
+                       METRICS_PROFILE_RATE=1)
+    def test_profiled_view_keeps_csrf_check(self):
+        """Профилируемый запрос проходит остальные middleware."""
+        post = Post.objects.get()
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        with self.assertLogs('yatube.metrics'):
+            response = client.post(reverse('add_comment', kwargs={
+                'username': self.user.username, 'post_id': post.pk,
+            }), {'text': 'Без токена'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(post.comments.exists())
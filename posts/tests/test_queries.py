@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from yatube.queries import NPlusOneError, inspect_queries, query_shape
+
+
+class QueryInspectorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = None
+        for i in range(3):
+            user = User.objects.create_user(username=f'user-{i}')
+            cls.post = Post.objects.create(author=user, text=f'Текст {i}')
+            Comment.objects.create(post=cls.post, author=user, text='Да')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE a = 1 AND b IN (%s, %s)\n'
+                        "AND c = 'x'"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?',
+        )
+
+    def test_detects_repeated_queries(self):
+        """Повторы одной формы запроса находятся вместе с местом в коде."""
+        with inspect_queries(threshold=3) as inspector:
+            for post in Post.objects.all():
+                post.author.username
+        entry, = inspector.repeated()
+        self.assertEqual(entry.count, 3)
+        self.assertIn('auth_user', entry.sql)
+        self.assertTrue(any('test_queries.py' in line
+                            for line in entry.stack))
+        with override_settings(QUERY_NPLUSONE_RAISE=False):
+            with self.assertLogs('yatube.queries'):
+                inspector.report('тест')
+        with override_settings(QUERY_NPLUSONE_RAISE=True):
+            with self.assertLogs('yatube.queries'):
+                with self.assertRaises(NPlusOneError):
+                    inspector.report('тест')
+
+    def test_slow_query_logged_with_plan(self):
+        with inspect_queries(slow_ms=0) as inspector:
+            list(Post.objects.filter(author__username='user-1'))
+        with self.assertLogs('yatube.queries') as logs:
+            inspector.report('тест')
+        self.assertIn('Медленный запрос', logs.output[0])
+        self.assertIn('SEARCH', logs.output[0])
+
+    @override_settings(QUERY_INSPECTOR=True, QUERY_NPLUSONE_RAISE=True,
+                       QUERY_NPLUSONE_THRESHOLD=2)
+    def test_post_page_has_no_n_plus_one(self):
+        for user in User.objects.exclude(pk=self.post.author_id):
+            Comment.objects.create(post=self.post, author=user, text='Нет')
+        response = Client().get(reverse('post', kwargs={
+            'username': self.post.author.username, 'post_id': self.post.pk,
+        }))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube.db import REPLICA_ALIAS, check_connections, replica_reads
+
+INDEX_URL = reverse('index')
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    """Вторая SQLite-база с теми же данными изображает реплику."""
+
+    databases = {'default', REPLICA_ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases[REPLICA_ALIAS] = {
+            **connections['default'].settings_dict,
+            'TEST': {'MIRROR': 'default'},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections.databases[REPLICA_ALIAS]
+        delattr(connections._connections, REPLICA_ALIAS)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_user')
+        Post.objects.create(author=self.user, text='Текст')
+
+    def get_index(self):
+        cache.clear()
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = Client().get(INDEX_URL)
+        self.assertEqual(len(response.context['page']), 1)
+        return len(primary), len(replica)
+
+    def test_recent_changes_read_from_primary(self):
+        """Пока реплика может отставать, лента читается с основной базы."""
+        with override_settings(DB_REPLICA_LAG=60):
+            self.assertEqual(self.get_index()[1], 0)
+        with override_settings(DB_REPLICA_LAG=0):
+            primary, replica = self.get_index()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_go_to_primary(self):
+        with replica_reads():
+            with CaptureQueriesContext(connections['default']) as primary:
+                Post.objects.create(author=self.user, text='Еще текст')
+        self.assertTrue(any(query['sql'].startswith('INSERT INTO "posts_post"')
+                            for query in primary))
+
+    def test_health_check_closes_broken_connection(self):
+        replica = connections[REPLICA_ALIAS]
+        replica.ensure_connection()
+        # SQLite в памяти не закрывается, поэтому проверяется вызов close.
+        with mock.patch.object(replica, 'is_usable', return_value=False), \
+                mock.patch.object(replica, 'close') as close:
+            check_connections()
+        close.assert_called_once_with()
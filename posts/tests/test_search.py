@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.search import highlight, search
+from posts.stemmer import stem
+
+SEARCH_URL = reverse('search')
+
+
+class StemmerTest(TestCase):
+    def test_russian_word_forms(self):
+        """Формы одного слова сводятся к одной основе."""
+        for words in (('кошка', 'кошки', 'кошками'),
+                      ('красивый', 'красивая', 'красивыми'),
+                      ('читать', 'читали', 'читаем'),
+                      ('ёлка', 'елки')):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_highlight_escapes_text(self):
+        self.assertEqual(
+            highlight('<b>Кошки</b> спят', 'кошка'),
+            '&lt;b&gt;<mark>Кошки</mark>&lt;/b&gt; спят',
+        )
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.cat = Post.objects.create(
+            author=cls.user, text='Кошки спят на диване')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошка и кошки: про кошек')
+        cls.dog = Post.objects.create(
+            author=cls.user, text='Собака гуляет во дворе')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ranked_results(self):
+        """Находятся формы слова, чаще упомянувшие его записи выше."""
+        self.assertEqual(list(search('кошка')), [self.cats, self.cat])
+        self.assertEqual(list(search('кошки спят')), [self.cat])
+        self.assertEqual(list(search('!!!')), [])
+
+    def test_index_follows_changes(self):
+        dog = Post.objects.get(pk=self.dog.pk)
+        dog.text = 'Кот гуляет во дворе'
+        dog.save()
+        self.assertEqual(list(search('собака')), [])
+        self.assertEqual(list(search('кот')), [dog])
+        dog.delete()
+        self.assertEqual(list(search('кот')), [])
+
+    def test_search_page(self):
+        response = Client().get(SEARCH_URL, {'q': 'собаки гуляли'})
+        self.assertEqual(list(response.context['page']), [self.dog])
+        self.assertContains(response, '<mark>Собака</mark>')
+
+    def test_rebuild_search_index(self):
+        Post.objects.filter(pk=self.dog.pk).update(text='Кот')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(search('кот')), [self.dog])
+
+    def test_admin_search(self):
+        request = RequestFactory().get('/')
+        queryset, distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'собаки')
+        self.assertEqual(list(queryset), [self.dog])
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+from posts.stats import get_stats
+
+NAME_1 = 'test_user'
+NAME_2 = 'user-2'
+PROFILE_1_URL = reverse('profile', kwargs={'username': NAME_1})
+FOLLOW_1_URL = reverse('profile_follow', kwargs={'username': NAME_1})
+UNFOLLOW_1_URL = reverse('profile_unfollow', kwargs={'username': NAME_1})
+NEW_POST_URL = reverse('new_post')
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1)
+        cls.user_2 = User.objects.create_user(username=NAME_2)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.authorized_client_2 = Client()
+        self.authorized_client_2.force_login(self.user_2)
+        get_stats(self.user)
+        get_stats(self.user_2)
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_stats_follow_views(self):
+        """Статистика обновляется при подписке и отписке."""
+        self.authorized_client_2.get(FOLLOW_1_URL)
+        self.assertStats(self.user, followers=1, following=0)
+        self.assertStats(self.user_2, followers=0, following=1)
+        self.authorized_client_2.get(UNFOLLOW_1_URL)
+        self.assertStats(self.user, followers=0)
+        self.assertStats(self.user_2, following=0)
+
+    def test_stats_posts_and_comments(self):
+        """Статистика обновляется при создании и удалении записей."""
+        self.authorized_client.post(NEW_POST_URL, {'text': 'Текст'})
+        post = Post.objects.get(author=self.user)
+        Comment.objects.create(post=post, author=self.user_2, text='Да')
+        self.assertStats(self.user, posts=1)
+        self.assertStats(self.user_2, comments=1)
+        post.delete()
+        self.assertStats(self.user, posts=0)
+        self.assertStats(self.user_2, comments=0)
+
+    def test_author_card_renders_from_stats(self):
+        Follow.objects.create(user=self.user_2, author=self.user)
+        response = self.authorized_client.get(PROFILE_1_URL)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertEqual(response.context['stats'].followers, 1)
+
+    def test_post_delete_cost_does_not_grow_with_comments(self):
+        """Удаление записи снимает комментарии со статистики разом."""
+        def delete_with_comments(count):
+            post = Post.objects.create(author=self.user, text='Текст')
+            Comment.objects.bulk_create([
+                Comment(post=post, author=self.user_2, text='Да')
+                for _ in range(count)
+            ])
+            UserStats.objects.filter(user=self.user_2).update(comments=count)
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            self.assertStats(self.user_2, comments=0)
+            return len(queries)
+        self.assertEqual(delete_with_comments(2), delete_with_comments(10))
+
+    def test_decrement_stops_at_zero(self):
+        """Счетчик с расхождением не уходит ниже нуля при удалении."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        UserStats.objects.filter(user=self.user).update(posts=0)
+        post.delete()
+        self.assertStats(self.user, posts=0)
+
+    def test_recount_stats_repairs_drift(self):
+        """Команда recount_stats исправляет расхождения."""
+        Post.objects.create(author=self.user, text='Текст')
+        UserStats.objects.filter(user=self.user).update(posts=10)
+        UserStats.objects.filter(user=self.user_2).delete()
+        out = StringIO()
+        call_command('recount_stats', stdout=out)
+        self.assertIn('исправлено: 2', out.getvalue())
+        self.assertStats(self.user, posts=1)
+        self.assertStats(self.user_2, posts=0)
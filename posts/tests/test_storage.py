@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import Post, User
+from posts.storage import is_content_addressed
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_user')
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='Текст',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся одним файлом по хэшу."""
+        post_1 = self.create_post('first.gif')
+        post_2 = self.create_post('second.gif')
+        self.assertEqual(post_1.image.name, post_2.image.name)
+        self.assertTrue(is_content_addressed(post_1.image.name))
+        self.assertTrue(post_1.image.name.startswith('posts/'))
+
+    def age(self, *names):
+        hour_ago = time.time() - 60 * 60
+        for name in names:
+            os.utime(os.path.join(TEMP_MEDIA_ROOT, name),
+                     (hour_ago, hour_ago))
+
+    def test_file_removed_after_last_reference(self):
+        post_1 = self.create_post()
+        post_2 = self.create_post()
+        name = post_1.image.name
+        self.age(name)
+        post_1.delete()
+        self.assertTrue(self.exists(name))
+        post_2.image = None
+        post_2.save()
+        self.assertFalse(self.exists(name))
+
+    @override_settings(POSTS_MEDIA_GRACE=60)
+    def test_recent_upload_is_kept(self):
+        """Файл, только что загруженный снова, release не удаляет."""
+        post = self.create_post()
+        name = post.image.name
+        self.age(name)
+        self.create_post().delete()
+        self.assertTrue(self.exists(name))
+        post.delete()
+        self.assertTrue(self.exists(name))
+
+    def test_dedupe_media_command(self):
+        """Команда переносит старые файлы по хэшу и удаляет лишние."""
+        storage = FileSystemStorage()
+        old_names = [
+            storage.save('posts/old.gif', ContentFile(SMALL_GIF)),
+            storage.save('posts/old.gif', ContentFile(SMALL_GIF)),
+        ]
+        orphan = storage.save('posts/orphan.gif', ContentFile(SMALL_GIF))
+        fresh = storage.save('posts/fresh.gif', ContentFile(SMALL_GIF))
+        self.age(*old_names, orphan)
+        for name in old_names:
+            Post.objects.create(author=self.user, text='Текст', image=name)
+        call_command('dedupe_media', stdout=StringIO())
+        self.assertTrue(self.exists(fresh))
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_content_addressed(name))
+        self.assertTrue(self.exists(name))
+        for name in old_names + [orphan]:
+            self.assertFalse(self.exists(name))
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Post, Task, TimelineEntry, User
+from posts.search import search
+from posts.tasks import claim, enqueue, run_pending, task
+
+calls = []
+
+
+@task('test_append')
+def append(value):
+    calls.append(value)
+
+
+@task('test_fail')
+def fail():
+    raise ValueError('Сбой')
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key(self):
+        """Задача с занятым ключом не ставится и выполняется один раз."""
+        enqueue('test_append', key='once', value=1)
+        enqueue('test_append', key='once', value=2)
+        self.assertEqual(run_pending(), (1, 1))
+        enqueue('test_append', key='once', value=3)
+        self.assertEqual(run_pending(), (0, 0))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_delayed_task_waits(self):
+        enqueue('test_append', delay=60, value=1)
+        self.assertEqual(run_pending(), (0, 0))
+
+    @override_settings(TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_DELAY=0)
+    def test_retries_then_fails(self):
+        enqueue('test_fail')
+        with self.assertLogs('posts.tasks'):
+            self.assertEqual(run_pending(), (1, 0))
+        queued = Task.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (Task.QUEUED, 1))
+        with self.assertLogs('posts.tasks'):
+            run_pending()
+        failed = Task.objects.get()
+        self.assertEqual((failed.status, failed.attempts), (Task.FAILED, 2))
+        self.assertIn('Сбой', failed.last_error)
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue('test_append', value=1)
+        pk, = claim(10)
+        self.assertEqual(claim(10), [])
+        Task.objects.filter(pk=pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(claim(10), [pk])
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode(self):
+        enqueue('test_append', value=1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_error_is_logged(self):
+        """Ошибка задачи в режиме eager не доходит до вызвавшего кода."""
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            enqueue('test_fail')
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class PublishTest(TransactionTestCase):
+    def test_post_is_published_by_worker(self):
+        """Новая запись попадает в ленты и поиск после run_tasks."""
+        author = User.objects.create_user(username='author')
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=author)
+        client = Client()
+        client.force_login(author)
+        response = client.post(reverse('new_post'), {'text': 'Новая запись'})
+        self.assertRedirects(response, reverse('index'))
+        post = Post.objects.get()
+        self.assertTrue(Task.objects.filter(
+            key=f'publish_post:{post.pk}', status=Task.QUEUED,
+        ).exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('run_tasks', '--once', stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=follower, post=post,
+        ).exists())
+        self.assertEqual(list(search('запись')), [post])
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+INDEX_URL = reverse('index')
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'card-img bg-light'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Текст',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_background_generation_shows_placeholder(self):
+        """Пока миниатюра создается в фоне, лента выводит заглушку."""
+        executor = mock.Mock()
+        with mock.patch.object(thumbnails, 'run_inline', return_value=False), \
+                mock.patch.object(thumbnails, '_get_executor',
+                                  return_value=executor):
+            response = Client().get(INDEX_URL)
+            thumbnails.schedule(self.post)
+        self.assertContains(response, PLACEHOLDER)
+        executor.submit.assert_called_once()
+        thumbnails._pending.clear()
+
+    # sorl-thumbnail 12.6 масштабирует через Image.ANTIALIAS (Pillow < 10).
+    @skipUnless(hasattr(Image, 'ANTIALIAS'), 'sorl-thumbnail несовместим')
+    def test_warm_thumbnails_command(self):
+        self.assertIsNone(thumbnails.ready_image(self.post.image))
+        out = StringIO()
+        call_command('warm_thumbnails', stdout=out)
+        self.assertIn('1 из 1', out.getvalue())
+        image = thumbnails.ready_image(self.post.image)
+        self.assertIsNotNone(image)
+        response = Client().get(INDEX_URL)
+        self.assertContains(response, image.url)
+        self.assertContains(response, 'type="image/webp"')
+        self.assertNotContains(response, PLACEHOLDER)
+
+    @skipUnless(hasattr(Image, 'ANTIALIAS'), 'sorl-thumbnail несовместим')
+    def test_variants_formats_and_widths(self):
+        """Для каждой ширины создаются WebP и запасной JPEG."""
+        image = thumbnails.generate(self.post.image)
+        self.assertEqual(
+            [source['type'] for source in image.sources], ['image/webp'],
+        )
+        webp = image.sources[0]['srcset'].split(', ')
+        self.assertEqual(len(webp), len(thumbnails.FEED_WIDTHS))
+        self.assertTrue(all('.webp ' in item for item in webp))
+        self.assertIn('.jpg 960w', image.srcset)
+        self.assertEqual((image.width, image.height), (960, 339))
+
+    def mark_ready(self, post):
+        for _, width, geometry, options in thumbnails.feed_variants():
+            thumbnail = thumbnails.backend.get_thumbnail_file(
+                post.image, geometry, **options,
+            )
+            thumbnail.set_size((width, round(width * thumbnails.FEED_RATIO)))
+            default.kvstore.set(thumbnail)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(url)
+        self.assertNotContains(response, PLACEHOLDER)
+        return len(queries)
+
+    def test_feed_reads_thumbnails_once_per_page(self):
+        """Готовность миниатюр ленты проверяется одним запросом
+        на страницу, а не запросом на каждую запись."""
+        self.mark_ready(self.post)
+        expected = self.count_queries(INDEX_URL)
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.user,
+                text='Текст',
+                image=f'posts/feed_{number}.gif',
+            )
+            self.mark_ready(post)
+        self.assertEqual(self.count_queries(INDEX_URL), expected)
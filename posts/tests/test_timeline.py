@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User, UserStats
+
+NAME_1 = 'test_user'
+NAME_2 = 'user-2'
+FOLLOW_INDEX_URL = reverse('follow_index')
+FOLLOW_2_URL = reverse('profile_follow', kwargs={'username': NAME_2})
+UNFOLLOW_2_URL = reverse('profile_unfollow', kwargs={'username': NAME_2})
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1)
+        cls.user_2 = User.objects.create_user(username=NAME_2)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_feed(self):
+        response = self.authorized_client.get(FOLLOW_INDEX_URL)
+        return list(response.context['page'])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новая запись попадает в ленты подписчиков при публикации."""
+        Follow.objects.create(user=self.user, author=self.user_2)
+        post = Post.objects.create(author=self.user_2, text='Текст')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.assertEqual(self.get_feed(), [post])
+
+    def test_follow_backfills_and_unfollow_cleans_up(self):
+        """Подписка дозаполняет ленту, отписка очищает ее."""
+        post = Post.objects.create(author=self.user_2, text='Текст')
+        self.authorized_client.get(FOLLOW_2_URL)
+        self.assertEqual(self.get_feed(), [post])
+        self.authorized_client.get(UNFOLLOW_2_URL)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_feed(), [])
+
+    @override_settings(POSTS_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_request(self):
+        """Записи популярных авторов подмешиваются при чтении ленты."""
+        Follow.objects.create(user=self.user, author=self.user_2)
+        post = Post.objects.create(author=self.user_2, text='Текст')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [post])
+
+    def test_recount_stats_marks_celebrities(self):
+        """recount_stats сверяет признак популярности с новым лимитом."""
+        Follow.objects.create(user=self.user, author=self.user_2)
+        self.assertFalse(UserStats.objects.get(user=self.user_2).celebrity)
+        with override_settings(POSTS_FANOUT_LIMIT=0):
+            call_command('recount_stats', stdout=StringIO())
+        self.assertTrue(UserStats.objects.get(user=self.user_2).celebrity)
+
+
+@override_settings(POSTS_FANOUT_LIMIT=1)
+class CelebrityDemotionTest(TransactionTestCase):
+    def test_posts_fan_out_when_author_is_no_longer_celebrity(self):
+        """После отписки, сделавшей автора обычным, его записи в лентах."""
+        author = User.objects.create_user(username=NAME_2)
+        follower, other = (User.objects.create_user(username=name)
+                           for name in (NAME_1, 'user-3'))
+        Follow.objects.create(user=follower, author=author)
+        Follow.objects.create(user=other, author=author)
+        post = Post.objects.create(author=author, text='Текст')
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=other).get().delete()
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(follower.pk, post.pk)],
+        )
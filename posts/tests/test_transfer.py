@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import (Comment, Follow, Group, ImportCheckpoint, Post,
+                          TimelineEntry, User)
+from posts.search import search
+
+PUB_DATE = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.user_2 = User.objects.create_user(username='user-2')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Текст',
+        )
+        for i in range(5):
+            post = Post.objects.create(
+                author=cls.user, text=f'Запись про котов {i}',
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.user_2,
+                                   text=f'Комментарий {i}')
+        Post.objects.update(pub_date=PUB_DATE)
+        Follow.objects.create(user=cls.user_2, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', self.path, stderr=StringIO())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def import_posts(self, *args):
+        call_command('import_posts', self.path, '--batch-size', '2', *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def clear_database(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_export_lines(self):
+        with open(self.path, encoding='utf-8') as file:
+            models = [json.loads(line)['model'] for line in file]
+        self.assertEqual(models, ['group'] + ['post'] * 5 + ['follow'])
+
+    def test_round_trip(self):
+        """Импорт восстанавливает данные, даты, ленты и поиск."""
+        self.clear_database()
+        self.import_posts()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 5)
+        post = Post.objects.select_related('author', 'group').first()
+        self.assertEqual(post.author.username, 'test_user')
+        self.assertEqual(post.group.slug, 'test-slug')
+        self.assertEqual(post.pub_date, PUB_DATE)
+        self.assertEqual(post.comments.get().author.username, 'user-2')
+        follower = User.objects.get(username='user-2')
+        self.assertTrue(Follow.objects.filter(user=follower).exists())
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=follower).count(), 5)
+        self.assertEqual(search('кот').count(), 5)
+        self.assertEqual(post.author.stats.posts, 5)
+
+    def test_resume_from_checkpoint(self):
+        """С --resume импорт продолжается с сохраненной позиции."""
+        self.clear_database()
+        with open(self.path, 'rb') as file:
+            lines = file.readlines()
+        offset = len(lines[0]) + len(lines[1]) + len(lines[2])
+        Group.objects.create(title='Группа', slug='test-slug',
+                             description='Текст')
+        ImportCheckpoint.objects.create(name=self.path, offset=offset)
+        self.import_posts('--resume')
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_checkpoint_commits_with_batch(self):
+        """Позиция сохраняется вместе с пачкой и не опережает ее."""
+        self.clear_database()
+        with mock.patch('posts.transfer.search.index_posts',
+                        side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                self.import_posts()
+        self.assertEqual(Post.objects.count(), 2)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual(json.loads(checkpoint.counts), {'group': 1,
+                                                         'post': 2})
+        self.import_posts('--resume')
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(set(Post.objects.values_list('pub_date', flat=True)),
+                         {PUB_DATE})
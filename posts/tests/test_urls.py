@@ -130,3 +130,31 @@ class PostURLTests(TestCase):
                 response = self.authorized_client.get(url)
                 self.assertTemplateUsed(
                     response, templates_url_names[url])
+
+
+class SignupURLTests(TestCase):
+    def signup(self, username):
+        return Client().post(reverse('signup'), {
+            'username': username,
+            'password1': 'Zq7-secret-pass',
+            'password2': 'Zq7-secret-pass',
+        })
+
+    def test_signup_rejects_site_paths(self):
+        """Имя, совпадающее с адресом страницы сайта, занять нельзя:
+        профиль с таким именем был бы недоступен."""
+        for username in ('search', 'metrics', 'new', 'follow'):
+            with self.subTest(username):
+                response = self.signup(username)
+                self.assertFormError(
+                    response, 'form', 'username',
+                    'Это имя совпадает с адресом страницы сайта.',
+                )
+                self.assertFalse(
+                    User.objects.filter(username=username).exists())
+
+    def test_signup_accepts_profile_path(self):
+        response = self.signup(NAME)
+        self.assertRedirects(response, INDEX_URL)
+        self.assertEqual(
+            self.client.get(PROFILE_URL).context['author'].username, NAME)
@@ -1,11 +1,17 @@
+import base64
 import shutil
+import tempfile
+from unittest import mock
 
-from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.stats import get_stats
 
 INDEX_URL = reverse('index')
 FOLLOW_INDEX_URL = reverse('follow_index')
@@ -20,11 +26,16 @@ GROUP_2_URL = reverse('group', kwargs={'slug': SLUG_2})
 PROFILE_1_URL = reverse('profile', kwargs={'username': NAME_1})
 FOLLOW_2_URL = reverse('profile_follow', kwargs={'username': NAME_2})
 UNFOLLOW_2_URL = reverse('profile_unfollow', kwargs={'username': NAME_2})
+FUTURE_CURSOR = base64.urlsafe_b64encode(
+    b'2099-01-01T00:00:00+00:00|999').decode().rstrip('=')
 
 
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
         super().setUpClass()
         cls.user = User.objects.create_user(username=NAME_1)
         cls.user_2 = User.objects.create_user(username=NAME_2)
@@ -64,8 +75,9 @@ class PostPagesTests(TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
 
     def setUp(self):
         self.authorized_client = Client()
@@ -131,6 +143,51 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response.context['page']), 3)
 
 
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username=NAME_1)
+        Post.objects.bulk_create(
+            list(map(lambda x: Post(author=user, text='Text'), range(13)))
+        )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация листает ленту вперед и назад."""
+        response = self.client.get(INDEX_URL)
+        first_page = list(response.context['page'])
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(response.context['page'].has_previous())
+        next_cursor = response.context['page'].next_cursor
+        self.assertContains(response, f'?before={next_cursor}')
+        response = self.client.get(INDEX_URL, {'before': next_cursor})
+        second_page = list(response.context['page'])
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(response.context['page'].has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        response = self.client.get(
+            INDEX_URL, {'after': response.context['page'].previous_cursor},
+        )
+        self.assertEqual(list(response.context['page']), first_page)
+
+    def test_invalid_cursor_opens_first_page(self):
+        response = self.client.get(INDEX_URL, {'before': 'мусор'})
+        self.assertEqual(len(response.context['page']), 10)
+
+    def test_empty_after_page_opens_first_page(self):
+        """Курсор after без более новых записей открывает первую страницу."""
+        response = self.client.get(INDEX_URL, {'after': FUTURE_CURSOR})
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_previous())
+        self.assertIsNotNone(page.next_cursor)
+
+
 class FollowViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -169,3 +226,123 @@ class FollowViewsTest(TestCase):
         self.authorized_client.force_login(self.user_2)
         response = self.authorized_client.get(FOLLOW_INDEX_URL)
         self.assertNotIn(self.new_post, response.context['page'])
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1)
+        cls.user_2 = User.objects.create_user(username=NAME_2)
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug=SLUG_1,
+            description='Текст',
+        )
+        Follow.objects.create(user=cls.user_2, author=cls.user)
+        get_stats(cls.user)
+        cls.URL_NAMES = {
+            INDEX_URL: cls.user_2,
+            GROUP_1_URL: cls.user_2,
+            PROFILE_1_URL: cls.user_2,
+            FOLLOW_INDEX_URL: cls.user_2,
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user_2)
+
+    def create_posts(self, count):
+        for _ in range(count):
+            post = Post.objects.create(
+                author=self.user,
+                text='Текст',
+                group=self.group,
+            )
+            Comment.objects.create(post=post, author=self.user_2, text='Да')
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Количество запросов ленты не зависит от числа постов
+        на странице."""
+        self.create_posts(1)
+        expected = {url: self.count_queries(url) for url in self.URL_NAMES}
+        self.create_posts(9)
+        for url in self.URL_NAMES:
+            with self.subTest(url):
+                self.assertEqual(self.count_queries(url), expected[url])
+
+    def test_missing_stats_are_created_once(self):
+        """Профиль без строки UserStats создает ее за четыре запроса."""
+        self.create_posts(1)
+        warm = self.count_queries(PROFILE_1_URL)
+        UserStats.objects.filter(user=self.user).delete()
+        self.assertEqual(self.count_queries(PROFILE_1_URL), warm + 4)
+        self.assertEqual(self.count_queries(PROFILE_1_URL), warm)
+
+    def test_feed_shows_annotated_comment_count(self):
+        """Количество комментариев выводится в ленте."""
+        self.create_posts(1)
+        for url in self.URL_NAMES:
+            with self.subTest(url):
+                cache.clear()
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.context['page'][0].comment_count, 1)
+                self.assertContains(response, 'Комментариев: 1')
+
+
+@mock.patch('posts.views.COMMENTS_PER_PAGE', 2)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NAME_1)
+        cls.post = Post.objects.create(author=cls.user, text='Текст поста')
+        for i in range(5):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий {i}')
+        cls.POST_URL = reverse('post', kwargs={
+            'username': NAME_1, 'post_id': cls.post.id,
+        })
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comment_pages(self):
+        """Комментарии листаются курсором от новых к старым."""
+        response = self.client.get(self.POST_URL)
+        page = response.context['comments_page']
+        self.assertEqual([c.text for c in page],
+                         ['Комментарий 4', 'Комментарий 3'])
+        self.assertContains(response, f'?before={page.next_cursor}')
+        response = self.client.get(self.POST_URL,
+                                   {'before': page.next_cursor})
+        self.assertEqual([c.text for c in response.context['comments_page']],
+                         ['Комментарий 2', 'Комментарий 1'])
+
+    def test_empty_after_page(self):
+        """Курсор after без более новых комментариев не роняет страницу."""
+        response = self.client.get(self.POST_URL, {'after': FUTURE_CURSOR})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [c.text for c in response.context['comments_page']],
+            ['Комментарий 4', 'Комментарий 3'],
+        )
+
+    def test_streamed_comments(self):
+        """Все комментарии отдаются потоком после тела записи."""
+        response = self.client.get(self.POST_URL, {'comments': 'all'})
+        self.assertTrue(response.streaming)
+        with CaptureQueriesContext(connection) as queries:
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(queries), 3)
+        positions = [content.index('Текст поста')] + [
+            content.index(f'Комментарий {i}') for i in range(4, -1, -1)
+        ]
+        self.assertEqual(positions, sorted(positions))
+        self.assertTrue(content.rstrip().endswith('</html>'))
@@ -0,0 +1,227 @@
+"""Миниатюры записей, которые создаются вне обработки запроса.
+
+Миниатюры ставятся в очередь пула потоков после сохранения формы записи
+и при показе записи без готовой миниатюры; пока миниатюры нет, шаблон
+выводит заглушку, а по готовности кэш страниц записи сбрасывается.
+Готовность миниатюр страницы ленты проверяется одним чтением kvstore
+(prefetch), а не запросом на каждую запись.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from .caching import invalidate_post
+
+logger = logging.getLogger(__name__)
+
+FEED_WIDTHS = (480, 720, 960)
+FEED_RATIO = 339 / 960
+FEED_SIZES = '(min-width: 992px) 960px, 100vw'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+# Форматы в порядке предпочтения браузером; последний выводится в <img>
+# для браузеров без поддержки остальных.
+FEED_FORMATS = (
+    ('image/webp', {'format': 'WEBP', 'quality': 75}),
+    ('image/jpeg', {'format': 'JPEG', 'quality': 80}),
+)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile миниатюры без обращения к хранилищу и kvstore."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnails(self, keys):
+        """Готовые миниатюры по ключам kvstore за одно чтение."""
+        kvstore = default.kvstore
+        empty = cached_db_kvstore.EMPTY_VALUE
+        if not isinstance(kvstore, cached_db_kvstore.KVStore):
+            values = {key: kvstore._get_raw(key) for key in keys}
+        else:
+            values = kvstore.cache.get_many(keys)
+            missing = [key for key in keys if key not in values]
+            if missing:
+                found = dict(KVStore.objects.filter(
+                    key__in=missing,
+                ).values_list('key', 'value'))
+                fetched = {key: found.get(key, empty) for key in missing}
+                kvstore.cache.set_many(
+                    fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+                )
+                values.update(fetched)
+        return {
+            key: deserialize_image_file(value)
+            for key, value in values.items()
+            if value and value != empty
+        }
+
+
+backend = ReadyThumbnailBackend()
+
+
+class FeedImage:
+    """Варианты картинки ленты для <picture>: sources и запасной <img>."""
+
+    sizes = FEED_SIZES
+
+    def __init__(self, variants):
+        srcsets = {}
+        for mime, width, thumbnail in variants:
+            srcsets.setdefault(mime, []).append(f'{thumbnail.url} {width}w')
+        self.sources = [
+            {'type': mime, 'srcset': ', '.join(srcset)}
+            for mime, srcset in srcsets.items()
+        ]
+        self.srcset = self.sources.pop()['srcset']
+        largest = variants[-1][2]
+        self.url = largest.url
+        self.width = largest.width
+        self.height = largest.height
+
+
+def feed_variants():
+    """Тройки (mime, ширина, geometry) с опциями sorl для каждого варианта."""
+    for mime, options in FEED_FORMATS:
+        for width in FEED_WIDTHS:
+            geometry = f'{width}x{round(width * FEED_RATIO)}'
+            yield mime, width, geometry, {**FEED_OPTIONS, **options}
+
+
+def _variant_keys(image):
+    return [
+        (mime, width, add_prefix(
+            backend.get_thumbnail_file(image, geometry, **options).key,
+        ))
+        for mime, width, geometry, options in feed_variants()
+    ]
+
+
+def ready_images(images):
+    """Словарь картинка -> FeedImage или None; kvstore читается один раз."""
+    keys = {image: _variant_keys(image) for image in images}
+    ready = backend.get_ready_thumbnails([
+        key for variants in keys.values() for _, _, key in variants
+    ])
+    result = {}
+    for image, variants in keys.items():
+        if all(key in ready for _, _, key in variants):
+            result[image] = FeedImage([
+                (mime, width, ready[key]) for mime, width, key in variants
+            ])
+        else:
+            result[image] = None
+    return result
+
+
+def ready_image(image):
+    """FeedImage, если готовы все варианты картинки, иначе None."""
+    return ready_images([image])[image]
+
+
+def prefetch(posts):
+    """Проверяет готовность миниатюр страницы записей одним чтением."""
+    posts = [post for post in posts if post.image]
+    images = ready_images([post.image for post in posts])
+    for post in posts:
+        post.ready_image = images[post.image]
+    return posts
+
+
+def run_inline():
+    # Базу SQLite в памяти нельзя разделить между потоками.
+    in_memory = getattr(connections['default'], 'is_in_memory_db', None)
+    return (
+        getattr(settings, 'POSTS_THUMBNAIL_WORKERS', 2) == 0
+        or (in_memory is not None and in_memory())
+    )
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'POSTS_THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def generate(image):
+    """Создает все варианты картинки; возвращает FeedImage или None."""
+    try:
+        return FeedImage([
+            (mime, width, default.backend.get_thumbnail(
+                image, geometry, **options,
+            ))
+            for mime, width, geometry, options in feed_variants()
+        ])
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', image)
+        return None
+
+
+def _generate_in_background(post):
+    try:
+        if generate(post.image) is not None:
+            invalidate_post(post)
+    finally:
+        with _lock:
+            _pending.discard(post.image.name)
+        connection.close()
+
+
+def schedule(post):
+    """Ставит миниатюру записи в очередь; в inline-режиме создает сразу."""
+    if not post.image:
+        return None
+    if run_inline():
+        return generate(post.image)
+    with _lock:
+        if post.image.name in _pending:
+            return None
+        _pending.add(post.image.name)
+        executor = _get_executor()
+    executor.submit(_generate_in_background, post)
+    return None
+
+
+def schedule_posts(posts):
+    """schedule для каждой записи пакета с картинкой."""
+    for post in posts:
+        schedule(post)
+
+
+def feed_image(post):
+    """Готовые варианты картинки записи или None, пока они создаются."""
+    if not post.image:
+        return None
+    if hasattr(post, 'ready_image'):
+        image = post.ready_image
+    else:
+        image = ready_image(post.image)
+    return image or schedule(post)
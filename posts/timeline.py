@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .tasks import enqueue_on_commit, task
+
+
+def _fanout_limit():
+    return getattr(settings, 'POSTS_FANOUT_LIMIT', 1000)
+
+
+def _backfill_size():
+    return getattr(settings, 'POSTS_TIMELINE_BACKFILL', 200)
+
+
+def celebrity_ids(author_ids):
+    """Авторы, чьи записи не раскладываются по лентам подписчиков.
+
+    Их записи лента подмешивает при чтении (fan-out-on-read). Признак
+    хранится в UserStats.celebrity, поэтому проверка стоит одного поиска
+    по индексу на автора, сколько бы подписчиков у него ни было.
+    """
+    return set(UserStats.objects.filter(
+        user_id__in=author_ids, celebrity=True,
+    ).values_list('user_id', flat=True))
+
+
+def reclassify(author_ids):
+    """Сверяет UserStats.celebrity авторов с числом их подписчиков.
+
+    Автор без строки UserStats считается обычным, поэтому строку нужно
+    создать до подписки на него (см. posts.signals.follow_saved).
+    Автор популярен, пока подписчиков больше POSTS_FANOUT_LIMIT. Тому,
+    кто перестал быть популярным, задача backfill_followers раскладывает
+    записи, опубликованные без раскладки.
+    """
+    stats = UserStats.objects.filter(user_id__in=author_ids)
+    limit = _fanout_limit()
+    stats.filter(celebrity=False, followers__gt=limit).update(celebrity=True)
+    demoted = list(stats.filter(
+        celebrity=True, followers__lte=limit,
+    ).values_list('user_id', flat=True))
+    if not demoted:
+        return
+    UserStats.objects.filter(user_id__in=demoted).update(celebrity=False)
+    for author_id in demoted:
+        enqueue_on_commit('backfill_followers', author_id=author_id)
+
+
+def fan_out(posts):
+    """Раскладывает новые записи по лентам подписчиков авторов."""
+    posts = {post.pk: post for post in posts}
+    author_ids = {post.author_id for post in posts.values()}
+    author_ids -= celebrity_ids(author_ids)
+    if not author_ids:
+        return
+    followers = Follow.objects.filter(
+        author_id__in=author_ids,
+    ).values_list('user_id', 'author_id')
+    by_author = {}
+    for user_id, author_id in followers.iterator():
+        by_author.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for post in posts.values()
+        for user_id in by_author.get(post.author_id, ())
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def _backfill(user_ids, author_id):
+    if celebrity_ids([author_id]):
+        return
+    posts = list(Post.objects.filter(
+        author_id=author_id,
+    ).values('pk', 'pub_date')[:_backfill_size()])
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post['pk'],
+            author_id=author_id,
+            pub_date=post['pub_date'],
+        )
+        for user_id in user_ids
+        for post in posts
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    _backfill([user_id], author_id)
+
+
+@task('backfill_followers')
+def backfill_followers(author_id):
+    """Дозаполняет ленты всех подписчиков записями автора."""
+    _backfill(Follow.objects.filter(
+        author_id=author_id,
+    ).values_list('user_id', flat=True).iterator(), author_id)
+
+
+def remove(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user):
+    """Лента подписок пользователя.
+
+    Обычно это один проход по индексу (user, -pub_date) таблицы
+    TimelineEntry; записи авторов с огромным числом подписчиков
+    добавляются запросом по author_id.
+    """
+    posts = Post.objects.for_feed()
+    followed = Follow.objects.filter(user=user).values('author_id')
+    celebrities = celebrity_ids(followed)
+    if not celebrities:
+        return posts.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date',
+        )
+    inbox = TimelineEntry.objects.filter(user=user).values('post_id')
+    return posts.filter(Q(pk__in=inbox) | Q(author_id__in=celebrities))
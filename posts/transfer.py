@@ -0,0 +1,195 @@
+"""Потоковый перенос групп, записей, комментариев и подписок в JSON Lines.
+
+Каждая строка — объект {"model": ..., "fields": {...}}; ссылки на
+пользователей и группы записаны по username и slug, комментарии вложены
+в свою запись. Импорт идет пачками через bulk_create, поэтому память
+зависит от размера пачки, а не файла, а сигналы моделей заменены
+пакетными вызовами тех же счетчиков, лент и индексов.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+from .stats import recount
+
+GROUP_FIELDS = ('title', 'slug', 'description')
+
+
+def _line(model, fields):
+    return json.dumps(
+        {'model': model, 'fields': fields},
+        cls=DjangoJSONEncoder, ensure_ascii=False,
+    ) + '\n'
+
+
+def _keyset(queryset, batch_size):
+    """Пачки queryset по возрастанию pk без OFFSET."""
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[
+            :batch_size
+        ])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def export_lines(batch_size=1000):
+    """Строки JSON Lines со всеми группами, записями и подписками."""
+    for groups in _keyset(Group.objects.all(), batch_size):
+        for group in groups:
+            yield _line('group', {
+                field: getattr(group, field) for field in GROUP_FIELDS
+            })
+    posts = Post.objects.select_related('author', 'group')
+    for batch in _keyset(posts, batch_size):
+        comments = {}
+        for comment in Comment.objects.filter(
+                post__in=batch).select_related('author').order_by('pk'):
+            comments.setdefault(comment.post_id, []).append({
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            })
+        for post in batch:
+            yield _line('post', {
+                'author': post.author.username,
+                'group': post.group.slug if post.group_id else None,
+                'text': post.text,
+                'pub_date': post.pub_date,
+                'image': post.image.name or '',
+                'comments': comments.get(post.pk, []),
+            })
+    follows = Follow.objects.select_related('user', 'author')
+    for batch in _keyset(follows, batch_size):
+        for follow in batch:
+            yield _line('follow', {
+                'user': follow.user.username,
+                'author': follow.author.username,
+            })
+
+
+def _users(usernames):
+    """Пользователи по username; отсутствующие создаются без пароля."""
+    usernames = set(usernames)
+    users = dict(User.objects.filter(
+        username__in=usernames).values_list('username', 'pk'))
+    missing = usernames - users.keys()
+    if missing:
+        new_users = [User(username=username) for username in missing]
+        for user in new_users:
+            user.set_unusable_password()
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        users.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+    return users
+
+
+def create_with_pks(model, objects, batch_size=None):
+    """bulk_create, после которого у объектов есть pk на любой базе.
+
+    Вызывается внутри транзакции.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objects, batch_size=batch_size)
+    # Без RETURNING pk берутся с конца таблицы: после вставки транзакция
+    # держит блокировку записи до коммита, поэтому последние id — наши.
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    pks = list(model.objects.order_by('-pk').values_list(
+        'pk', flat=True)[:len(objects)])
+    for obj, pk in zip(objects, reversed(pks)):
+        obj.pk = pk
+    return objects
+
+
+def create_with_dates(model, objects, field, batch_size=None):
+    """create_with_pks, который сохраняет заданные даты в поле auto_now_add.
+
+    bulk_create записывает в такое поле текущее время, поэтому даты
+    объектов ставятся следом bulk_update в той же транзакции.
+    """
+    dates = [getattr(obj, field) for obj in objects]
+    objects = create_with_pks(model, objects, batch_size=batch_size)
+    for obj, date in zip(objects, dates):
+        setattr(obj, field, date)
+    model.objects.bulk_update(objects, [field], batch_size=batch_size)
+    return objects
+
+
+def import_groups(rows):
+    Group.objects.bulk_create(
+        [Group(**{field: row[field] for field in GROUP_FIELDS})
+         for row in rows],
+        ignore_conflicts=True,
+    )
+    caching.invalidate_groups()
+    return len(rows)
+
+
+def import_posts(rows):
+    users = _users(
+        [row['author'] for row in rows]
+        + [c['author'] for row in rows for c in row['comments']]
+    )
+    groups = dict(Group.objects.filter(
+        slug__in={row['group'] for row in rows if row['group']},
+    ).values_list('slug', 'pk'))
+    posts = create_with_dates(Post, [
+        Post(
+            author_id=users[row['author']],
+            group_id=groups.get(row['group']),
+            text=row['text'],
+            pub_date=parse_datetime(row['pub_date']),
+            image=row['image'],
+        ) for row in rows
+    ], 'pub_date')
+    create_with_dates(Comment, [
+        Comment(
+            post_id=post.pk,
+            author_id=users[comment['author']],
+            text=comment['text'],
+            created=parse_datetime(comment['created']),
+        ) for post, row in zip(posts, rows) for comment in row['comments']
+    ], 'created')
+    counters.change_post_counts(posts, 1)
+    timeline.fan_out(posts)
+    search.index_posts(posts)
+    recount(list(users.values()))
+    scopes = {'index'}
+    group_slugs = {pk: slug for slug, pk in groups.items()}
+    for row, post in zip(rows, posts):
+        scopes.add(f'author:{row["author"]}')
+        if post.group_id:
+            scopes.add(f'group:{group_slugs[post.group_id]}')
+    caching.bump(*scopes)
+    return len(posts)
+
+
+def import_follows(rows):
+    users = _users(
+        [row['user'] for row in rows] + [row['author'] for row in rows]
+    )
+    follows = [
+        Follow(user_id=users[row['user']], author_id=users[row['author']])
+        for row in rows if row['user'] != row['author']
+    ]
+    Follow.objects.bulk_create(follows, ignore_conflicts=True)
+    recount(list(users.values()))
+    timeline.reclassify({follow.author_id for follow in follows})
+    for follow in follows:
+        counters.reset_feed_count(follow.user_id)
+        timeline.backfill(follow.user_id, follow.author_id)
+    caching.bump(*{f'author:{username}' for username in users})
+    return len(follows)
+
+
+IMPORTERS = {
+    'group': import_groups,
+    'post': import_posts,
+    'follow': import_follows,
+}
@@ -0,0 +1,126 @@
+import os
+import tempfile
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+
+def _max_bytes():
+    return getattr(settings, 'POSTS_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def _max_pixels():
+    return getattr(settings, 'POSTS_IMAGE_MAX_PIXELS', 40_000_000)
+
+
+def _max_side():
+    return getattr(settings, 'POSTS_IMAGE_MAX_SIDE', 2048)
+
+
+class OversizedUpload(UploadedFile):
+    """Файл сверх лимита запроса: содержимое отброшено, известен размер."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(None, name, content_type, size)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Перестает принимать файлы, когда запрос превысил лимит байт.
+
+    Ставится первым обработчиком запроса декоратором limited_uploads:
+    лишние куски не доходят до следующих обработчиков и не пишутся ни
+    в память, ни на диск.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.received = 0
+        self.oversized = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > _max_bytes():
+            self.oversized = True
+        return None if self.oversized else raw_data
+
+    def file_complete(self, file_size):
+        if self.oversized:
+            return OversizedUpload(
+                self.file_name, self.content_type, self.received,
+            )
+        return None
+
+
+def limited_uploads(view):
+    """Принимает файлы запроса к view через LimitedUploadHandler.
+
+    Обработчик ставится только для форм записей: OversizedUpload без
+    содержимого умеет разбирать только PostForm. Обработчики меняются
+    до чтения тела запроса, а CsrfViewMiddleware читает request.POST
+    раньше view, поэтому проверка CSRF перенесена внутрь декоратора.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, LimitedUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def check_limits(upload):
+    """Текст ошибки, если файл или картинка больше лимитов, иначе None.
+
+    Размер картинки читается из заголовка, без декодирования пикселей.
+    """
+    if upload.size > _max_bytes():
+        return f'Файл больше {filesizeformat(_max_bytes())}.'
+    image = getattr(upload, 'image', None)
+    if image is not None and image.width * image.height > _max_pixels():
+        return f'Картинка больше {_max_pixels()} пикселей.'
+    return None
+
+
+def normalize_image(upload):
+    """Поворачивает картинку по EXIF, уменьшает и пересохраняет без EXIF.
+
+    JPEG декодируется сразу в уменьшенном масштабе (Image.draft), поэтому
+    память не зависит от разрешения исходного снимка.
+    """
+    max_side = _max_side()
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image.draft(None, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        icc_profile = image.info.get('icc_profile')
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            image = image.convert('RGBA')
+            format_, extension, options = 'PNG', 'png', {'optimize': True}
+        else:
+            image = image.convert('RGB')
+            format_, extension, options = 'JPEG', 'jpg', {
+                'quality': getattr(settings, 'POSTS_IMAGE_QUALITY', 85),
+                'optimize': True,
+                'progressive': True,
+            }
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        output = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        )
+        image.save(output, format_, **options)
+    size = output.tell()
+    output.seek(0)
+    name = f'{os.path.splitext(os.path.basename(upload.name))[0]}.{extension}'
+    return UploadedFile(output, name, Image.MIME[format_], size)
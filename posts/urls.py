@@ -15,6 +15,9 @@ urlpatterns = [
     path('follow/',
          views.follow_index,
          name='follow_index'),
+    path('search/',
+         views.search,
+         name='search'),
     path('<str:username>/',
          views.profile,
          name='profile'),
@@ -1,31 +1,43 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import CreateView
 
+from . import publish, thumbnails
+from .caching import cache_page_versioned, group_by_slug, read_replica
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Post, User
+from .paginators import COMMENTS_PER_PAGE, PER_PAGE, CursorPaginator, paginate
+from .search import search as search_posts
+from .stats import get_stats
+from .streaming import comment_chunks, render_stream
+from .timeline import follow_feed
+from .uploads import limited_uploads
 
 
+@cache_page_versioned('index')
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, Post.objects.for_feed(), 'all')
+    thumbnails.prefetch(page)
     return render(request, 'index.html', {
         'page': page,
         'paginator': paginator,
     })
 
 
+@cache_page_versioned('group:{slug}')
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = group_by_slug(slug)
+    if group is None:
+        raise Http404
+    paginator, page = paginate(request, group.posts.for_feed(),
+                               f'group:{group.id}')
+    thumbnails.prefetch(page)
     return render(request, 'group.html', {
         'group': group,
         'page': page,
@@ -33,24 +45,44 @@ def group_posts(request, slug):
     })
 
 
+@read_replica('index')
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(query) if query else Post.objects.none()
+    paginator = Paginator(posts, PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    thumbnails.prefetch(page)
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        'paginator': paginator,
+    })
+
+
+@method_decorator(limited_uploads, name='dispatch')
 class PostView(LoginRequiredMixin, CreateView):
     form_class = PostForm
     success_url = reverse_lazy('index')
     template_name = 'posts/new_post.html'
 
+    @transaction.atomic
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super().form_valid(form)
+        publish.defer(form.instance)
+        response = super().form_valid(form)
+        publish.schedule(self.object)
+        return response
 
 
+@cache_page_versioned('author:{username}')
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, author.posts.for_feed(),
+                               f'author:{author.id}')
+    thumbnails.prefetch(page)
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page': page,
         'paginator': paginator,
     }
@@ -61,20 +93,34 @@ def profile(request, username):
     return render(request, 'profile.html', context)
 
 
+@cache_page_versioned('author:{username}', 'post:{post_id}')
 def post_view(request, username, post_id):
     author = get_object_or_404(User, username=username)
-    post = Post.objects.get(pk=post_id, author=author)
-    comments = post.comments.all()
-    form = CommentForm()
-    return render(request, 'posts/post.html', {
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id,
+                             author=author)
+    comments = post.comments.select_related('author')
+    context = {
         'author': author,
+        'stats': get_stats(author),
         'post': post,
-        'form': form,
+        'form': CommentForm(),
         'comments': comments,
-    })
+    }
+    if request.GET.get('comments') == 'all':
+        return render_stream(request, 'posts/post.html', context,
+                             'comments_stream',
+                             comment_chunks(comments, COMMENTS_PER_PAGE))
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE, field='created')
+    context['comments_page'] = paginator.get_page(
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    )
+    context['comments_paginator'] = paginator
+    return render(request, 'posts/post.html', context)
 
 
 @login_required()
+@limited_uploads
 def post_edit(request, username, post_id):
     if username != request.user.username:
         return redirect('post', username=username, post_id=post_id)
@@ -83,6 +129,8 @@ def post_edit(request, username, post_id):
                     instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            transaction.on_commit(lambda: thumbnails.schedule(post))
         return redirect('post', username=username, post_id=post_id)
     return render(request, 'posts/new_post.html', {
         'form': form,
@@ -99,9 +147,14 @@ def server_error(request):
 
 
 @login_required()
+@transaction.atomic
 def add_comment(request, username, post_id):
     form = CommentForm(data=request.POST or None)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        id=post_id,
+        author__username=username,
+    )
     if form.is_valid():
         form.instance.post = post
         form.instance.author = request.user
@@ -110,11 +163,12 @@ def add_comment(request, username, post_id):
 
 
 @login_required
+@read_replica('author:{user}')
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = follow_feed(request.user)
+    paginator, page = paginate(request, post_list,
+                               f'feed:{request.user.id}')
+    thumbnails.prefetch(page)
     return render(request, "follow.html", {
         'page': page,
         'paginator': paginator,
@@ -122,20 +176,16 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author != request.user and not Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists():
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('profile', username=username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     follow = get_object_or_404(
         Follow,
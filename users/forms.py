@@ -1,5 +1,7 @@
+from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import Resolver404, resolve, reverse
 
 User = get_user_model()
 
@@ -8,3 +10,17 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+    def clean_username(self):
+        """Имя, по адресу профиля которого отвечает другая страница
+        (search/, metrics/, admin/...), профилем стать не сможет."""
+        username = self.cleaned_data['username']
+        try:
+            url = reverse('profile', args=[username])
+            match = resolve(url)
+        except Resolver404:
+            match = None
+        if match is None or match.url_name != 'profile':
+            raise forms.ValidationError(
+                'Это имя совпадает с адресом страницы сайта.')
+        return username
@@ -0,0 +1,54 @@
+"""PostgreSQL с пулом соединений процесса.
+
+ENGINE = 'yatube.backends.postgresql', размеры пула — в POOL настроек базы:
+{'MIN_SIZE': 1, 'MAX_SIZE': 10}. Закрытое Django соединение возвращается
+в пул, поэтому CONN_MAX_AGE с пулом можно держать нулевым; MAX_SIZE не
+меньше числа потоков процесса, иначе getconn упадет с PoolError.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        # После fork у воркера свой pid и свой пул: сокеты мастера
+        # не используются.
+        key = (self.alias, os.getpid())
+        with _pools_lock:
+            if key not in _pools:
+                sizes = self.settings_dict.get('POOL', {})
+                _pools[key] = pool.ThreadedConnectionPool(
+                    sizes.get('MIN_SIZE', 1), sizes.get('MAX_SIZE', 10),
+                    **conn_params,
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        connections = self.get_pool(conn_params)
+        connection = connections.getconn()
+        if connection.closed:
+            connections.putconn(connection, close=True)
+            connection = connections.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Пул сам откатывает незавершенную транзакцию.
+                self.get_pool(self.get_connection_params()).putconn(
+                    self.connection, close=bool(self.connection.closed),
+                )
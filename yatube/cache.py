@@ -0,0 +1,211 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим кэшем.
+
+Общий уровень (база, файлы, Redis) задается отдельным алиасом в CACHES.
+Каждая запись через TieredCache публикуется в журнал инвалидаций в общем
+кэше; остальные процессы читают журнал не чаще SYNC_INTERVAL секунд и
+выбрасывают из своего LRU измененные ключи, а после clear() — весь LRU.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .metrics import CacheStatsMixin
+
+SEQUENCE_KEY = 'tiered:seq'
+LOG_PREFIX = 'tiered:log'
+CLEAR_MARKER = '*'
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class LocalTier:
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.seen = None
+        self.synced_at = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache(CacheStatsMixin, BaseCache):
+    """Бэкенд кэша для CACHES с LOCATION — алиасом общего кэша.
+
+    OPTIONS:
+        LOCAL_MAX_ENTRIES — размер LRU процесса (по умолчанию 1000);
+        LOCAL_TIMEOUT — сколько секунд запись живет в LRU (30);
+        SYNC_INTERVAL — как часто читать журнал инвалидаций (1);
+        LOG_SIZE — сколько последних инвалидаций хранит журнал (1000).
+
+    MAX_ENTRIES общего кэша должен с запасом превышать LOG_SIZE плюс
+    рабочий набор, иначе отсечение лишних ключей стирает журнал и каждый
+    воркер постоянно сбрасывает свой LRU.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.local_max_entries = int(options.pop('LOCAL_MAX_ENTRIES', 1000))
+        self.local_timeout = float(options.pop('LOCAL_TIMEOUT', 30))
+        self.sync_interval = float(options.pop('SYNC_INTERVAL', 1))
+        self.log_size = int(options.pop('LOG_SIZE', 1000))
+        super().__init__({**params, 'OPTIONS': options})
+        self.shared_alias = location
+        # LRU общий для потоков процесса; после fork у воркера свой pid,
+        # поэтому унаследованные от мастера записи не используются.
+        tier_key = (location, os.getpid())
+        with _local_tiers_lock:
+            if tier_key not in _local_tiers:
+                _local_tiers[tier_key] = LocalTier(
+                    self.local_max_entries, self.local_timeout,
+                )
+            self.local = _local_tiers[tier_key]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _sync(self):
+        local = self.local
+        now = time.monotonic()
+        if now - local.synced_at < self.sync_interval:
+            return
+        local.synced_at = now
+        sequence = self.shared.get(SEQUENCE_KEY, 0)
+        if local.seen is None or sequence < local.seen:
+            local.clear()
+        elif sequence - local.seen > self.log_size:
+            local.clear()
+        elif sequence > local.seen:
+            numbers = range(local.seen + 1, sequence + 1)
+            log = self.shared.get_many([f'{LOG_PREFIX}:{n}' for n in numbers])
+            if len(log) < len(numbers):
+                local.clear()
+            else:
+                for keys in log.values():
+                    if CLEAR_MARKER in keys:
+                        local.clear()
+                        break
+                    local.discard(keys)
+        local.seen = sequence
+
+    def _publish(self, keys):
+        self.local.discard(keys)
+        shared = self.shared
+        shared.add(SEQUENCE_KEY, 0, None)
+        for _ in range(10):
+            sequence = shared.incr(SEQUENCE_KEY)
+            if shared.add(f'{LOG_PREFIX}:{sequence}', list(keys), None):
+                break
+        shared.delete(f'{LOG_PREFIX}:{sequence - self.log_size}')
+
+    def _remember(self, key, value):
+        self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self.make_key(key, version)
+        pickled = self.local.get(local_key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+        value = self.shared.get(key, version=version)
+        if value is None:
+            return default
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found, missing = {}, []
+        for key in keys:
+            pickled = self.local.get(self.make_key(key, version))
+            if pickled is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._remember(self.make_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._publish([self.make_key(key, version)])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._publish([self.make_key(key, version) for key in data])
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._publish([self.make_key(key, version)])
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._publish([self.make_key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        self._publish([self.make_key(key, version) for key in keys])
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._publish([self.make_key(key, version)])
+        return value
+
+    def clear(self):
+        # Номер журнала переживает очистку, чтобы метку увидели все
+        # воркеры, в том числе уже прочитавшие текущий номер.
+        shared = self.shared
+        sequence = shared.get(SEQUENCE_KEY, 0)
+        shared.clear()
+        shared.add(SEQUENCE_KEY, sequence, None)
+        self._publish([CLEAR_MARKER])
+        self.local.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,65 @@
+"""Чтение с реплики и проверка постоянных соединений.
+
+ReplicaRouter отправляет чтения на алиас REPLICA_ALIAS только внутри
+replica_reads(), поэтому все остальное — записи, транзакции, админка —
+работает с основной базой. Какие view читают с реплики, решает
+posts.caching: только те, где данные не менялись дольше DB_REPLICA_LAG.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.core.signals import request_started
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+
+_local = threading.local()
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.databases
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Чтения ORM в блоке идут на реплику, если она настроена."""
+    previous = getattr(_local, 'replica', False)
+    _local.replica = enabled and replica_configured()
+    try:
+        yield
+    finally:
+        _local.replica = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_local, 'replica', False):
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA_ALIAS
+
+
+def check_connections(**kwargs):
+    """Закрывает оборвавшиеся постоянные соединения в начале запроса.
+
+    Работает для баз с CONN_HEALTH_CHECKS: переиспользуемое соединение
+    проверяется одним пингом, и запрос не падает на соединении, которое
+    закрыла база или балансировщик.
+    """
+    for connection in connections.all():
+        if (connection.connection is not None
+                and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
+
+
+request_started.connect(check_connections)
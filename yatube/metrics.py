@@ -0,0 +1,320 @@
+"""Легкие метрики запросов: время, SQL, кэш, шаблоны и размер ответа.
+
+MetricsMiddleware собирает показатели каждого запроса в RequestStats
+текущего потока и складывает их в гистограммы процесса по имени view.
+Шаблоны и кэш отчитываются через бэкенды этого модуля, указанные
+в TEMPLATES и CACHES. Гистограммы отдаются в текстовом формате
+Prometheus по адресу /metrics/; у каждого процесса они свои, поэтому
+при нескольких воркерах Prometheus опрашивает каждый из них.
+"""
+import cProfile
+import io
+import itertools
+import json
+import logging
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache.backends import locmem
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': (
+        'Время обработки запроса', DURATION_BUCKETS),
+    'yatube_request_db_queries': ('Запросов к базе за запрос', QUERY_BUCKETS),
+    'yatube_request_db_seconds': ('Время запросов к базе', DURATION_BUCKETS),
+    'yatube_request_template_seconds': (
+        'Время отрисовки шаблонов', DURATION_BUCKETS),
+    'yatube_response_bytes': ('Размер тела ответа', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'yatube_requests_total': 'Запросы по view и коду ответа',
+    'yatube_cache_requests_total': 'Чтения кэша по view и результату',
+}
+
+_MISSING = object()
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        return list(zip(
+            [*map(str, self.buckets), '+Inf'],
+            itertools.accumulate(self.counts),
+        ))
+
+
+def _labels(labels):
+    return ','.join(
+        f'{name}="{value}"'.replace('\n', ' ') for name, value in labels
+    )
+
+
+class Registry:
+    """Гистограммы и счетчики процесса с метками вида (('view', ...),)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {name: {} for name in HISTOGRAMS}
+            self.counters = {name: {} for name in COUNTERS}
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            series = self.histograms[name]
+            if labels not in series:
+                series[labels] = Histogram(HISTOGRAMS[name][1])
+            series[labels].observe(value)
+
+    def inc(self, name, labels, amount=1):
+        if amount:
+            with self.lock:
+                series = self.counters[name]
+                series[labels] = series.get(labels, 0) + amount
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, series in self.histograms.items():
+                lines.append(f'# HELP {name} {HISTOGRAMS[name][0]}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(series.items()):
+                    prefix = _labels(labels)
+                    for bound, count in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{{prefix},le="{bound}"}} {count}'
+                        )
+                    lines.append(f'{name}_sum{{{prefix}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{prefix}}} {histogram.count}'
+                    )
+            for name, series in self.counters.items():
+                lines.append(f'# HELP {name} {COUNTERS[name]}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(series.items()):
+                    lines.append(f'{name}{{{_labels(labels)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0
+        self.template_depth = 0
+        self.cache_paused = 0
+
+    def query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def current():
+    """RequestStats запроса, который обрабатывает текущий поток, или None."""
+    return getattr(_local, 'stats', None)
+
+
+def record_cache(hits, misses):
+    stats = current()
+    if stats is not None and not stats.cache_paused:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+@contextmanager
+def _cache_paused():
+    stats = current()
+    if stats is not None:
+        stats.cache_paused += 1
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.cache_paused -= 1
+
+
+class CacheStatsMixin:
+    """Считает попадания и промахи get/get_many бэкенда кэша."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            record_cache(0, 1)
+            return default
+        record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # get_many базового класса вызывает get для каждого ключа.
+        with _cache_paused():
+            found = super().get_many(keys, version=version)
+        record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(CacheStatsMixin, locmem.LocMemCache):
+    pass
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return super().render(context, request)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонизатор Django, который замеряет время отрисовки."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class MetricsMiddleware:
+    """Собирает метрики запроса; ставится первым в MIDDLEWARE.
+
+    Если METRICS_PROFILE_VIEW задает имя view, каждый
+    METRICS_PROFILE_RATE-й его вызов выполняется под cProfile, а самые
+    дорогие функции пишутся в лог. Профилировщик включается в
+    process_view и выключается после ответа, поэтому остальные
+    middleware, в том числе проверка CSRF, работают как обычно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.calls = itertools.count()
+
+    def __call__(self, request):
+        stats = _local.stats = RequestStats()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+            self.finish_profile(request)
+        self.record(request, response, stats,
+                    time.perf_counter() - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.METRICS_PROFILE_VIEW
+                and _view_name(request) == settings.METRICS_PROFILE_VIEW
+                and not next(self.calls) % settings.METRICS_PROFILE_RATE):
+            request._metrics_profiler = cProfile.Profile()
+            request._metrics_profiler.enable()
+        return None
+
+    def finish_profile(self, request):
+        profiler = getattr(request, '_metrics_profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        del request._metrics_profiler
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(
+            'cumulative',
+        ).print_stats(30)
+        logger.info('Профиль %s %s\n%s', _view_name(request),
+                    request.path, output.getvalue())
+
+    def record(self, request, response, stats, duration):
+        view = _view_name(request)
+        labels = (('view', view),)
+        size = None if response.streaming else len(response.content)
+        registry.observe('yatube_request_duration_seconds', labels, duration)
+        registry.observe('yatube_request_db_queries', labels, stats.queries)
+        registry.observe('yatube_request_db_seconds', labels, stats.db_time)
+        registry.observe('yatube_request_template_seconds', labels,
+                         stats.template_time)
+        if size is not None:
+            registry.observe('yatube_response_bytes', labels, size)
+        registry.inc('yatube_requests_total',
+                     labels + (('status', response.status_code),))
+        registry.inc('yatube_cache_requests_total',
+                     labels + (('result', 'hit'),), stats.cache_hits)
+        registry.inc('yatube_cache_requests_total',
+                     labels + (('result', 'miss'),), stats.cache_misses)
+        if settings.METRICS_LOG_REQUESTS:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 3),
+                'db_queries': stats.queries,
+                'db_ms': round(stats.db_time * 1000, 3),
+                'cache_hits': stats.cache_hits,
+                'cache_misses': stats.cache_misses,
+                'template_ms': round(stats.template_time * 1000, 3),
+                'bytes': size,
+            }, ensure_ascii=False))
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,185 @@
+"""Журнал медленных запросов и поиск N+1 для разработки и стенда.
+
+QueryInspector подключается к execute_wrapper всех соединений и
+группирует запросы по форме — SQL без значений параметров. Форма,
+повторенная за запрос QUERY_NPLUSONE_THRESHOLD раз, считается N+1 и
+попадает в лог вместе с местом в шаблоне и стеком кода проекта, откуда
+пришел повтор; запросы дольше QUERY_SLOW_MS пишутся с планом EXPLAIN.
+"""
+import logging
+import os
+import re
+import sys
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+SHAPE_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+THIS_FILE = os.path.abspath(__file__)
+
+
+class NPlusOneError(AssertionError):
+    """Повторяющиеся запросы при QUERY_NPLUSONE_RAISE = True."""
+
+
+def query_shape(sql):
+    for pattern, replacement in SHAPE_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _template_origin():
+    """Место в шаблоне, который сейчас отрисовывается, или None."""
+    frame = sys._getframe()
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def _project_stack():
+    """Кадры стека из кода проекта, без библиотек и этого модуля."""
+    return [
+        f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:'
+        f'{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and frame.filename != THIS_FILE
+        and 'site-packages' not in frame.filename
+    ]
+
+
+class QueryShape:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.time = 0
+        self.template = None
+        self.stack = []
+
+
+class QueryInspector:
+    def __init__(self, threshold=None, slow_ms=None, ignore=None):
+        self.threshold = (settings.QUERY_NPLUSONE_THRESHOLD
+                          if threshold is None else threshold)
+        self.slow_ms = (settings.QUERY_SLOW_MS
+                        if slow_ms is None else slow_ms)
+        self.ignore = [re.compile(pattern) for pattern in (
+            settings.QUERY_NPLUSONE_IGNORE if ignore is None else ignore
+        )]
+        self.shapes = {}
+        self.slow = []
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed = time.perf_counter() - started
+        self.record(sql, params, elapsed, context['connection'])
+        return result
+
+    def record(self, sql, params, elapsed, connection):
+        shape = query_shape(sql)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = QueryShape(sql)
+        entry.count += 1
+        entry.time += elapsed
+        # Стек снимается только для первого повтора: одиночные
+        # запросы не платят за traceback.
+        if entry.count == 2:
+            entry.template = _template_origin()
+            entry.stack = _project_stack()
+        if elapsed * 1000 >= self.slow_ms:
+            self.slow.append((sql, params, elapsed, _template_origin(),
+                              _project_stack(),
+                              self.explain(connection, sql, params)))
+
+    def explain(self, connection, sql, params):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        self.explaining = True
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'{connection.ops.explain_query_prefix()} {sql}',
+                        params,
+                    )
+                    rows = cursor.fetchall()
+        except DatabaseError as error:
+            return f'EXPLAIN не выполнен: {error}'
+        finally:
+            self.explaining = False
+        return '\n'.join(' '.join(map(str, row)) for row in rows)
+
+    def repeated(self):
+        return [
+            entry for shape, entry in self.shapes.items()
+            if entry.count >= self.threshold
+            and not any(pattern.search(shape) for pattern in self.ignore)
+        ]
+
+    def report(self, label):
+        """Пишет находки в лог; при QUERY_NPLUSONE_RAISE падает на N+1."""
+        for sql, params, elapsed, template, stack, plan in self.slow:
+            logger.warning(
+                'Медленный запрос %.1f мс в %s%s: %s %r\n%s\n%s',
+                elapsed * 1000, label, f' ({template})' if template else '',
+                sql, params, '\n'.join(stack), plan or '',
+            )
+        problems = []
+        for entry in self.repeated():
+            problems.append(
+                f'N+1 в {label}: {entry.count} запросов за '
+                f'{entry.time * 1000:.1f} мс'
+                + (f' из шаблона {entry.template}' if entry.template else '')
+                + f'\n{entry.sql}\n' + '\n'.join(entry.stack)
+            )
+            logger.warning(problems[-1])
+        if problems and settings.QUERY_NPLUSONE_RAISE:
+            raise NPlusOneError('\n\n'.join(problems))
+
+
+@contextmanager
+def inspect_queries(**options):
+    """Собирает запросы блока кода во всех соединениях."""
+    inspector = QueryInspector(**options)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(inspector))
+        yield inspector
+
+
+class QueryInspectorMiddleware:
+    """Проверяет запросы каждого обращения; включается QUERY_INSPECTOR."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTOR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inspect_queries() as inspector:
+            response = self.get_response(request)
+        inspector.report(f'{request.method} {request.path}')
+        return response
@@ -1,15 +1,20 @@
 import os
+import sys
+
+import environ
+
+env = environ.Env()
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = '(y1v4gpi_q7vrhd1_$nemn3%!c6@qrfenm#e)ll9)vdq)r88l#'
 
-DEBUG = True
+DEBUG = env.bool('DEBUG', default=True)
 
-ALLOWED_HOSTS = [
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=[
     "localhost",
     "18.224.27.202",
-]
+])
 
 INSTALLED_APPS = [
     'users',
@@ -29,6 +34,8 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.queries.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,7 +52,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,13 +71,54 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# База задается переменными из .env (см. docker-compose.yaml); без них —
+# SQLite рядом с проектом. DB_POOL_SIZE > 0 включает для PostgreSQL пул
+# соединений процесса (yatube.backends.postgresql).
+DB_ENGINE = env('DB_ENGINE', default='django.db.backends.sqlite3')
+DB_POOL_SIZE = env.int('DB_POOL_SIZE', default=0)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DB_ENGINE,
+        'NAME': env('DB_NAME', default=os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': env('POSTGRES_USER', default=''),
+        'PASSWORD': env('POSTGRES_PASSWORD', default=''),
+        'HOST': env('DB_HOST', default=''),
+        'PORT': env('DB_PORT', default=''),
+        # Соединение живет между запросами, а не открывается на каждый.
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+        # Перед запросом оборванное соединение закрывается (yatube.db).
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
     }
 }
 
+if DB_POOL_SIZE and DB_ENGINE == 'django.db.backends.postgresql':
+    DATABASES['default'].update({
+        'ENGINE': 'yatube.backends.postgresql',
+        'POOL': {
+            'MIN_SIZE': env.int('DB_POOL_MIN_SIZE', default=1),
+            'MAX_SIZE': DB_POOL_SIZE,
+        },
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=0),
+    })
+
+# Реплика для чтения лент: DB_REPLICA_NAME (файл SQLite или имя базы)
+# и/или DB_REPLICA_HOST; остальные параметры — как у основной базы.
+if env('DB_REPLICA_NAME', default='') or env('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': env('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': env('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': env('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['yatube.db.ReplicaRouter']
+
+# Сколько секунд после изменения scope страницы читаются с основной базы,
+# пока реплика догоняет ее (posts.caching.settled).
+DB_REPLICA_LAG = env.float('DB_REPLICA_LAG', default=5)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,12 +161,154 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# CACHE_BACKEND: locmem — кэш процесса (по умолчанию), db, file или redis —
+# общий для всех воркеров кэш с LRU процесса перед ним (yatube.cache).
+CACHE_BACKEND = env('CACHE_BACKEND', default='locmem')
+
+# Бэкенды db и file по умолчанию держат 300 ключей и при переполнении
+# удаляют треть; журнал инвалидаций TieredCache сам занимает до LOG_SIZE
+# (1000) ключей, поэтому лимит должен быть много больше рабочего набора.
+CACHE_MAX_ENTRIES = env.int('CACHE_MAX_ENTRIES', default=100_000)
+
+SHARED_CACHES = {
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': env('CACHE_LOCATION', default='yatube_cache'),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env(
+            'CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache'),
+        ),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    # Требует пакет django-redis.
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': env(
+            'CACHE_LOCATION', default='redis://127.0.0.1:6379/1',
+        ),
+    },
 }
 
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.metrics.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_MAX_ENTRIES': env.int(
+                    'CACHE_LOCAL_MAX_ENTRIES', default=1000,
+                ),
+                'LOCAL_TIMEOUT': env.int('CACHE_LOCAL_TIMEOUT', default=30),
+            },
+        },
+        'shared': SHARED_CACHES[CACHE_BACKEND],
+    }
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
+
+# Адреса, с которых можно читать /metrics/.
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=INTERNAL_IPS)
+
+# Писать в лог yatube.metrics строку JSON о каждом запросе.
+METRICS_LOG_REQUESTS = env.bool('METRICS_LOG_REQUESTS', default=False)
+
+# Имя view (например, 'index' или 'post'), каждый METRICS_PROFILE_RATE-й
+# вызов которого выполняется под cProfile.
+METRICS_PROFILE_VIEW = env('METRICS_PROFILE_VIEW', default='')
+
+METRICS_PROFILE_RATE = env.int('METRICS_PROFILE_RATE', default=100)
+
+# Поиск N+1 и журнал медленных запросов (yatube.queries).
+QUERY_INSPECTOR = env.bool('QUERY_INSPECTOR', default=DEBUG)
+
+# Сколько запросов одной формы за обращение считать N+1.
+QUERY_NPLUSONE_THRESHOLD = env.int('QUERY_NPLUSONE_THRESHOLD', default=5)
+
+# Падать с NPlusOneError вместо записи в лог, например в тестах.
+QUERY_NPLUSONE_RAISE = env.bool('QUERY_NPLUSONE_RAISE', default=False)
+
+# Регулярные выражения для форм запросов, повтор которых ожидаем:
+# чтения кэша в базе.
+QUERY_NPLUSONE_IGNORE = [SHARED_CACHES['db']['LOCATION']]
+
+QUERY_SLOW_MS = env.int('QUERY_SLOW_MS', default=100)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.metrics': {
+            'handlers': ['console'],
+            'level': env('METRICS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+        'yatube.queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# 'page' — нумерованные страницы, 'counted' — нумерованные страницы
+# со счетчиками из кэша вместо COUNT(*), 'cursor' — keyset по pub_date
+POSTS_PAGINATION = 'page'
+
+POSTS_COUNT_TIMEOUT = 60 * 60
+
+# Авторы с большим числом подписчиков читаются в ленту при запросе,
+# записи остальных раскладываются по лентам при публикации.
+POSTS_FANOUT_LIMIT = 1000
+
+POSTS_TIMELINE_BACKFILL = 200
+
+# Страницы лент и записей живут в кэше до изменения данных
+# (см. posts.caching), поэтому срок хранения можно держать большим.
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Потоки, которые создают миниатюры вне обработки запроса;
+# 0 — создавать миниатюры прямо в запросе.
+POSTS_THUMBNAIL_WORKERS = env.int('POSTS_THUMBNAIL_WORKERS', default=2)
+
+# Очередь posts.tasks выполняет воркер manage.py run_tasks (сервис worker
+# в docker-compose). В тестах воркера нет, поэтому там задачи по умолчанию
+# выполняются сразу в процессе, который их поставил.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+TASKS_ALWAYS_EAGER = env.bool('TASKS_ALWAYS_EAGER', default=TESTING)
+
+TASKS_MAX_ATTEMPTS = 5
+
+# Задержка перед первым повтором в секундах; дальше она удваивается.
+TASKS_RETRY_DELAY = 10
+
+# Через сколько секунд задачу упавшего воркера заберет другой.
+TASKS_LEASE = 300
+
+# Загрузки в формы записей сверх лимита отбрасываются еще при чтении
+# запроса (см. posts.uploads.limited_uploads).
+POSTS_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+POSTS_IMAGE_MAX_PIXELS = 40_000_000
+
+# Картинки без ссылок, изменявшиеся позже стольких секунд назад,
+# не удаляются: их запись может быть еще не закоммичена.
+POSTS_MEDIA_GRACE = 60 * 60
+
+# Картинки записей уменьшаются до этой стороны и пересохраняются без EXIF.
+POSTS_IMAGE_MAX_SIDE = 2048
+
+POSTS_IMAGE_QUALITY = 85
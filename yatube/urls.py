@@ -5,11 +5,14 @@ from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
 
+from .metrics import metrics_view
+
 handler404 = "posts.views.page_not_found" # noqa
 handler500 = "posts.views.server_error" # noqa
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     path('about/', include('django.contrib.flatpages.urls')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
@@ -17,6 +20,7 @@ urlpatterns = [
          {'url': '/about-author/'}, name='author'),
     path('about-spec/', views.flatpage,
          {'url': '/about-spec/'}, name='spec'),
+    path('api/', include('posts.api_urls')),
     path('', include('posts.urls')),
 ]
 